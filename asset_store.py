@@ -0,0 +1,80 @@
+import os
+import io
+import json
+import hashlib
+import threading
+import importlib.util
+
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+class AssetStore:
+    """Persistent, content-addressed image store shared by every deck in a batch.
+
+    originals/<sha256>          raw downloaded bytes (identical photos from different URLs dedupe)
+    renditions/<sha256>_WxH.jpg downscaled + center-cropped to a PPT slot at `dpi`
+    index.json                  url -> sha256, so a known URL is never downloaded again
+    """
+    def __init__(self, root=".cache/assets", dpi=150, quality=82):
+        self.root = root
+        self.dpi = dpi
+        self.quality = quality
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "originals"), exist_ok=True)
+        os.makedirs(os.path.join(root, "renditions"), exist_ok=True)
+        self.index_path = os.path.join(root, "index.json")
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f: self.index = json.load(f)
+        except (OSError, ValueError): self.index = {}
+        self.stats = {"downloads": 0, "reused": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def _save_index(self):
+        with self._lock: snapshot = json.dumps(self.index)
+        tmp = f"{self.index_path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: f.write(snapshot)
+        os.replace(tmp, self.index_path)
+
+    def _original(self, url, download):
+        with self._lock: sha = self.index.get(url)
+        if sha and os.path.exists(os.path.join(self.root, "originals", sha)):
+            with self._lock: self.stats["reused"] += 1
+            return sha
+        data = download(url)
+        if not data: return None
+        sha = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.root, "originals", sha)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f: f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self.index[url] = sha
+            self.stats["downloads"] += 1
+            self.stats["bytes_in"] += len(data)
+        self._save_index()
+        return sha
+
+    def get(self, url, slot, download):
+        """Path to `url` rendered for a (width_in, height_in) slot; `download(url) -> bytes|None`."""
+        sha = self._original(url, download)
+        if not sha: return None
+        original = os.path.join(self.root, "originals", sha)
+        if not HAS_PIL: return original
+
+        w, h = int(slot[0] * self.dpi), int(slot[1] * self.dpi)
+        out = os.path.join(self.root, "renditions", f"{sha}_{w}x{h}.jpg")
+        if os.path.exists(out): return out
+        from PIL import Image, ImageOps
+        try:
+            with Image.open(original) as img:
+                img = ImageOps.exif_transpose(img).convert("RGB")
+                # Crop to the slot's aspect ratio so python-pptx doesn't stretch the photo
+                img = ImageOps.fit(img, (w, h), Image.LANCZOS)
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=self.quality, optimize=True, progressive=True)
+        except Exception:
+            return original
+        tmp = f"{out}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f: f.write(buf.getvalue())
+        os.replace(tmp, out)
+        with self._lock: self.stats["bytes_out"] += buf.tell()
+        return out
@@ -0,0 +1,88 @@
+"""Web page section extraction: BeautifulSoup + next_siblings walk (legacy) vs the single-pass collector.
+
+Large company-site pages are generated and saved to disk first, then every engine
+parses the same saved bytes. The legacy engine is the per-header sibling walk
+_scrape_web used before html_sections.py.
+
+Usage: python benchmarks/bench_html.py [--sections 400 800 1600] [--paras 6] [--runs 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from html_sections import extract_sections, HAS_LXML
+
+WORDS = ("revenue growth plant capacity export pharma api customers margin order book certified "
+         "facility segment investors annual report quarterly results dividend board").split()
+
+def fixture(n_sections, paras, seed=7):
+    rnd = random.Random(seed)
+    def sentence(): return " ".join(rnd.choice(WORDS) for _ in range(14)).capitalize() + "."
+    out = ["<html><head><title>Fixture</title><style>.x{color:red}</style><script>var t = 1;</script></head><body>",
+           '<div class="cookie-consent">We use cookies. <button>Accept</button></div>',
+           "<nav><ul>" + "".join(f'<li><a href="/p{i}">Page {i}</a></li>' for i in range(40)) + "</ul></nav><main>"]
+    for s in range(n_sections):
+        tag = ("h1", "h2", "h3")[s % 3]
+        title = "About Us" if s % 50 == 0 else "Investors" if s % 50 == 25 else f"Section {s}"
+        out.append(f"<{tag}>{title}</{tag}>")
+        for p in range(paras):
+            out.append(f"<p>{' '.join(sentence() for _ in range(3))} <b>Note {p}</b></p>")
+        out.append('<div class="share-buttons"><a>Tweet</a><a>Share</a></div>')
+        out.append("<ul>" + "".join(f"<li>{sentence()}</li>" for _ in range(3)) + "</ul>")
+    out.append("</main><footer>(c) Fixture Ltd. All rights reserved.</footer></body></html>")
+    return "\n".join(out).encode("utf-8")
+
+def legacy(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    for tag in soup(["script", "style", "nav", "footer", "iframe"]):
+        tag.extract()
+    sections = []
+    for header in soup.find_all(['h1', 'h2', 'h3']):
+        content = ""
+        for sib in header.next_siblings:
+            if sib.name in ['h1', 'h2', 'h3']: break
+            if hasattr(sib, 'get_text'): content += sib.get_text(separator=" ", strip=True) + " "
+        sections.append((header.get_text(), content))
+    return sections
+
+def timed(fn, content, runs):
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn(content)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, nargs="+", default=[400, 800, 1600])
+    parser.add_argument("--paras", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = [("legacy bs4", legacy), ("stdlib", lambda c: extract_sections(c, "stdlib")[0])]
+    if HAS_LXML: engines.append(("lxml", lambda c: extract_sections(c, "lxml")[0]))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for n in args.sections:
+            path = os.path.join(tmp, f"site_{n}.html")
+            with open(path, "wb") as f: f.write(fixture(n, args.paras))
+            paths.append((n, path))
+        print(f"{'page':>22} " + " ".join(f"{name:>12}" for name, _ in engines) + "   sections")
+        for n, path in paths:
+            with open(path, "rb") as f: content = f.read()
+            row, counts = [], []
+            for name, fn in engines:
+                ms, sections = timed(fn, content, args.runs)
+                row.append(f"{ms:10.1f}ms")
+                counts.append(len(sections))
+            label = f"{n} headers, {len(content) / 1e6:.1f} MB"
+            print(f"{label:>22} " + " ".join(f"{r:>12}" for r in row) + f"   {'/'.join(map(str, counts))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Deck render time: per-shape chrome (legacy) vs compiled template cloning.
+
+Usage: python benchmarks/bench_render.py [--decks 30]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ppt_generator import PPTGenerator
+
+def sample_data(i):
+    return {
+        "code_name": f"Project {i}",
+        "sector": "Pharma",
+        "slide_1": {"headline": "Vertically integrated API maker", "sub_headline": "Exports to 45 countries",
+                    "bullets": ["Multi-division portfolio", "Strong domestic brands", "WHO GMP certified plants"]},
+        "slide_2": {"metrics": {"Revenue (Latest)": "502 Cr", "EBITDA": "48 Cr", "PAT": "14 Cr"},
+                    "chart_data": {"years": ["2022", "2023", "2024"], "revenue_values": [401, 410, 502]}},
+        "slide_3": {"hooks": ["Growth", "Export reach", "Capacity headroom", "Margin recovery"]},
+    }
+
+def bench(compiled, decks, out_dir):
+    gen = PPTGenerator(compiled=compiled)
+    gen.generate_ppt(sample_data(0), [None], os.path.join(out_dir, "warmup.pptx")) # Builds the fragments once
+    t0 = time.perf_counter()
+    for i in range(decks):
+        gen.generate_ppt(sample_data(i), [None], os.path.join(out_dir, f"{compiled}_{i}.pptx"))
+    return (time.perf_counter() - t0) / decks * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decks", type=int, default=30)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as out_dir:
+        legacy = bench(False, args.decks, out_dir)
+        compiled = bench(True, args.decks, out_dir)
+    print(f"legacy   : {legacy:7.1f} ms/deck")
+    print(f"compiled : {compiled:7.1f} ms/deck  ({(1 - compiled / legacy) * 100:.0f}% faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Regression checks for dedup.py: a dropped chunk never takes text the kept chunks lack (exits non-zero).
+
+Public "web" copies are built from the one-pagers' own chunks: supersets (a section
+plus extra text, which must survive even though private outranks public), exact
+copies and trimmed near-duplicates. Coverage is measured on the filter's word
+shingles, so a near-duplicate may differ by the similarity threshold at most.
+
+Usage: python benchmarks/check_dedup.py
+"""
+import os
+import sys
+import glob
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from data_loader import UniversalLoader
+from dedup import NearDuplicateFilter, _priority
+
+DATA_DIR = os.path.join(ROOT, "IITB-Hackathon", "IITB-Hackathon", "Company Data")
+FILLER = ("The group commissioned a new formulation block and widened its export registrations across "
+          "regulated markets while the order book for contract manufacturing grew steadily. ").split()
+
+def web_copies(chunks, rnd):
+    out = []
+    for n, c in enumerate(c for c in chunks if len(c['text']) > 600):
+        words = c['text'].split()
+        extra = " ".join(rnd.choice(FILLER) + f"{n}x{k}" for k in range(len(words) // 3))
+        kind = n % 3
+        text = (c['text'] + " " + extra if kind == 0 else c['text'] if kind == 1
+                else " ".join(words[:int(len(words) * 0.95)]))
+        out.append({"id": f"web{n}", "source": "https://example.com", "location": "web", "type": "public_web_general",
+                    "text": text})
+    return out
+
+def lost(f, chunks, kept):
+    """Dropped chunks whose shingles the kept chunks cover less than the threshold."""
+    kept_ids = {c['id'] for c in kept}
+    union = set().union(*(f._shingles(c['text']) for c in kept))
+    bad = []
+    for c in chunks:
+        if c['id'] in kept_ids: continue
+        s = f._shingles(c['text'])
+        if s and len(s & union) / len(s) < f.threshold: bad.append((c['id'], len(s - union), len(s)))
+    return bad
+
+def main():
+    f = NearDuplicateFilter()
+    rnd = random.Random(3)
+    # A private chunk inside a bigger public one: the public superset stays and takes over its priority
+    words = [f"w{rnd.randint(0, 9999)}" for _ in range(560)]
+    small = {"id": "private", "type": "private_financial", "text": " ".join(words[:440])}
+    big = {"id": "public", "type": "public_web_general", "text": " ".join(words)}
+    kept, rep = f.filter([small, big])
+    assert [c['id'] for c in kept] == ["public"], f"superset dropped: {[c['id'] for c in kept]}"
+    assert _priority(kept[0]) == _priority(small), "superset did not inherit the contained chunk's priority"
+    assert rep["bytes_removed"] == len(small['text']), "report counts more than the contained chunk"
+
+    loader = UniversalLoader(cache_path=None, http_cache_dir=None)
+    failures = 0
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*", "*.md"))):
+        chunks = loader.load_data(path)
+        merged = chunks + web_copies(chunks, rnd)
+        kept, rep = f.filter(merged)
+        bad = lost(f, merged, kept)
+        failures += len(bad)
+        print(f"{'ok  ' if not bad else 'FAIL'} {os.path.basename(path):28} {len(merged):4} chunks, "
+              f"{rep['removed']:3} dropped, {rep['bytes_removed'] / 1024:6.1f} KB" + (f"  lost: {bad}" if bad else ""))
+    if failures: sys.exit(f"{failures} dropped chunks had text no kept chunk holds")
+    print("no dropped chunk loses text")
+
+if __name__ == "__main__":
+    main()
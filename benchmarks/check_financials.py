@@ -0,0 +1,71 @@
+"""Regression checks for financials.py against the bundled one-pagers (exits non-zero on a wrong figure).
+
+Figures are the one-pagers' own statement lines (INR Mn) converted to INR Cr.
+
+Usage: python benchmarks/check_financials.py
+"""
+import os
+import sys
+import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from data_loader import UniversalLoader
+from financials import FinancialExtractor, _KV
+
+DATA_DIR = os.path.join(ROOT, "IITB-Hackathon", "IITB-Hackathon", "Company Data")
+
+# company folder -> {(metric, year): expected INR Cr}
+EXPECTED = {
+    "electronics-centum": {("revenue", 2025): 1155.42, ("ebitda", 2025): 96.71, ("pat", 2024): 2.12, ("pat", 2025): 12.9},
+    "logistics-gati": {("revenue", 2025): 1510.01, ("pat", 2021): -41.07, ("pat", 2022): -16.48,
+                       ("pat", 2023): -11.87, ("pat", 2024): -28.37, ("pat", 2025): -18.62},
+    "pharma-ind-swift": {("revenue", 2024): 502.25, ("pat", 2022): -32.77, ("pat", 2023): -34.54,
+                         ("pat", 2024): 14.23},
+}
+
+def value(fin, metric, year):
+    return fin["metrics"][metric][fin["years"].index(year)] if year in fin["years"] else None
+
+def main():
+    assert _KV.findall("- PAT | 2022: -327.69 | 2023: None | 2024: - |") == [
+        ("2022", "-327.69"), ("2023", "None"), ("2024", "-")], "loss values must parse as numbers"
+    fx = FinancialExtractor()
+    for label in ("Net profit before tax and extra ordinary income", "PAT Margin", "EBITDA Margin"):
+        assert fx._match(label) == (None, None), f"{label!r} must not match a metric"
+
+    # Sources without a declared unit are not guessed: no "15 Cr" from a sheet that says 150 of something
+    sheet = {"id": "x1", "type": "private_financial", "text": "Sheet: P&L\nItem | 2022 | 2023 | 2024",
+             "table": {"years": [2022, 2023, 2024], "line_items": {"Revenue": [100, 120, 150], "PAT": [5, 6, 9]}}}
+    fin = fx.extract([sheet])
+    assert fin["unit_unknown"] == ["revenue", "pat"] and fin["metrics"]["revenue"] == [100, 120, 150], fin
+    assert not any(k.startswith(("Revenue (", "PAT")) for k in fx.slide_2(fin)["metrics"]), fx.slide_2(fin)
+    assert "Revenue (unit not stated)" in fx.summary(fin) and not fx.slide_2(fin)["chart_data"]["years"]
+    assert not fin["consumed"], "a table in an unknown unit must stay in the prompt"
+    sheet["text"] = "Sheet: P&L (₹ in Mn)\nItem | 2022 | 2023 | 2024"
+    fin = fx.extract([sheet])
+    assert not fin["unit_unknown"] and fin["metrics"]["revenue"] == [10, 12, 15], fin
+
+    loader = UniversalLoader(cache_path=None, http_cache_dir=None)
+    failures = 0
+    for folder, expected in EXPECTED.items():
+        path = glob.glob(os.path.join(DATA_DIR, folder, "*.md"))[0]
+        fin = fx.extract(loader.load_data(path))
+        slide = fx.slide_2(fin)["metrics"]
+        for (metric, year), want in expected.items():
+            got = value(fin, metric, year)
+            ok = got is not None and abs(got - want) < 0.01
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {folder:20} {metric:8} FY{year % 100:02d}: {got} (want {want})")
+        pat = [v for v in fin["metrics"].get("pat", []) if v is not None]
+        if pat and min(pat) < 0 and "pat" in fin["cagr"]:
+            start, stop = fin["cagr"]["pat"][1:]
+            if value(fin, "pat", start) <= 0 or value(fin, "pat", stop) <= 0:
+                failures += 1
+                print(f"FAIL {folder:20} PAT CAGR reported across a loss: {fin['cagr']['pat']}")
+        print(f"     {folder:20} slide 2: {slide}")
+    if failures: sys.exit(f"{failures} wrong figures")
+    print("all figures match the one-pagers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Site crawl against a local fixture website: order, budgets, robots.txt, the deadline and HTTP caching.
+
+The fixture serves robots.txt (one Disallow plus a Sitemap: line), a sitemap index
+pointing at a nested sitemap, investor/about/product pages, a deep link chain and a
+deliberately slow page. Every response carries ETag/Last-Modified and conditional
+requests get a 304. Pages are fetched through a real CachedFetcher: fresh hits,
+revalidation once the TTL has expired, and stale copies while the server errors.
+
+Usage: python benchmarks/crawl_fixture.py [--latency 0.05] [--slow 3] [--deadline 2]
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler import SiteCrawler
+from http_cache import HttpCache, CachedFetcher
+from data_loader import UniversalLoader
+
+FILLER = "We manufacture specialty chemicals for pharma and agro customers in 30 countries. " * 8
+
+def page(title, links=()):
+    nav = "".join(f'<a href="{href}">{href}</a> ' for href in links)
+    return (f"<html><body><nav>{nav}</nav><h1>{title}</h1><p>{FILLER}</p>"
+            f"<footer>(c) fixture</footer></body></html>")
+
+def site():
+    pages = {
+        "/": page("Home", ["/products", "/blog", "/about-us", "/private/board", "/logo.png",
+                           "https://elsewhere.example/"]),
+        "/products": page("Products", ["/products/a", "/products/b", "/slow"]),
+        "/products/a": page("Product A", ["/products/a/specs"]),
+        "/products/a/specs": page("Specs"),
+        "/products/b": page("Product B"),
+        "/blog": page("Blog", ["/blog/1", "/blog/2", "/blog/3"]),
+        "/blog/1": page("Post 1"), "/blog/2": page("Post 2"), "/blog/3": page("Post 3"),
+        "/about-us": page("About Us", ["/about-us/history"]),
+        "/about-us/history": page("Our History"),
+        "/investor-relations": page("Investor Relations", ["/investor-relations/annual-report-2024"]),
+        "/investor-relations/annual-report-2024": page("Annual Report 2024"),
+        "/financial-results": page("Financial Results"),
+        "/private/board": page("Board minutes"),
+        "/slow": page("Slow page"),
+    }
+    return pages
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+def start_site(latency, slow):
+    pages = site()
+    hits = []
+    state = {"fail": False, "not_modified": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args): pass
+
+        def do_GET(self):
+            port = self.server.server_port
+            hits.append(self.path)
+            time.sleep(slow if self.path == "/slow" else latency)
+            if self.path == "/robots.txt":
+                body, ctype = (f"User-agent: *\nDisallow: /private/\n"
+                               f"Sitemap: http://127.0.0.1:{port}/sitemap_index.xml\n").encode(), "text/plain"
+            elif self.path == "/sitemap_index.xml":
+                body, ctype = (f"<sitemapindex><sitemap><loc>http://127.0.0.1:{port}/sitemap-pages.xml</loc>"
+                               f"</sitemap></sitemapindex>").encode(), "application/xml"
+            elif self.path == "/sitemap-pages.xml":
+                locs = "".join(f"<url><loc>http://127.0.0.1:{port}{p}</loc></url>"
+                               for p in ("/investor-relations", "/financial-results", "/blog/3"))
+                body, ctype = f"<urlset>{locs}</urlset>".encode(), "application/xml"
+            elif self.path in pages:
+                body, ctype = pages[self.path].encode(), "text/html; charset=utf-8"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            if state["fail"]:
+                self.send_response(500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            if (self.headers.get("If-None-Match") == etag
+                    or self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+                state["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits, state
+
+def run(label, root, fetcher, **kwargs):
+    crawler = SiteCrawler(fetcher, **kwargs)
+    t0 = time.perf_counter()
+    pages = crawler.crawl(root)
+    wall = time.perf_counter() - t0
+    stats = next(iter(crawler.stats.values()))
+    print(f"\n{label}: {len(pages)} pages, {stats['fetched']} fetches, {wall:.2f}s"
+          + (" (deadline hit)" if stats["timed_out"] else ""))
+    for url, _ in pages: print(f"   {url.split(str(root.split('/')[2]), 1)[1] or '/'}")
+    return pages, wall
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fixture page")
+    parser.add_argument("--slow", type=float, default=3.0, help="Seconds the /slow page takes")
+    parser.add_argument("--deadline", type=float, default=2.0, help="Crawl time budget for the deadline run")
+    args = parser.parse_args()
+
+    srv, hits, state = start_site(args.latency, args.slow)
+    root = f"http://127.0.0.1:{srv.server_port}/"
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "http")
+        fetcher = CachedFetcher(cache=HttpCache(cache_dir, ttl=3600), timeout=15)
+        pages, _ = run("budget 6 pages, depth 2", root, fetcher, max_pages=6, max_depth=2, deadline=30)
+        assert not any("/private/" in u for u, _ in pages), "robots.txt Disallow ignored"
+        assert all(("investor" in u or "financial" in u) for u, _ in pages[:2]), "investor pages should come first"
+
+        _, wall = run(f"full site, {args.deadline}s deadline", root, fetcher, max_pages=50, max_depth=3,
+                      deadline=args.deadline)
+        assert wall < args.deadline + 1, "deadline overrun"
+        assert "/private/board" not in hits, "robots.txt Disallow ignored"
+
+        before = dict(fetcher.stats)
+        _, warm = run("same crawl again (HTTP cache)", root, fetcher, max_pages=6, max_depth=2, deadline=30)
+        assert fetcher.stats["fresh"] > before["fresh"], "fresh cache entries were not reused"
+        assert fetcher.stats["downloaded"] == before["downloaded"], "fresh pages downloaded again"
+
+        # A 1s TTL that has run out: every page is revalidated and the server answers 304
+        expired = CachedFetcher(cache=HttpCache(cache_dir, ttl=1), timeout=15)
+        time.sleep(1.1)
+        pages, _ = run("after the TTL expired (revalidation)", root, expired, max_pages=6, max_depth=2, deadline=30)
+        print(f"   {expired.stats}, {state['not_modified']} x 304")
+        assert pages and expired.stats["revalidated"] == state["not_modified"] > 0, "stale pages not revalidated"
+        assert expired.stats["downloaded"] == 0 and expired.stats["fresh"] == 0, "expired pages not revalidated"
+
+        # Server errors: stale copies are served rather than losing the pages
+        state["fail"] = True
+        down = CachedFetcher(cache=HttpCache(cache_dir, ttl=0), timeout=15)
+        stale, _ = run("server returning 500 (stale fallback)", root, down, max_pages=6, max_depth=2, deadline=30)
+        print(f"   {down.stats}")
+        assert [u for u, _ in stale] == [u for u, _ in pages], "stale copies not served while the server errors"
+        assert down.stats["stale"] > 0 and down.stats["downloaded"] == 0, "stale fallback not used"
+        state["fail"] = False
+
+        loader = UniversalLoader(cache_path=None, http_cache_dir=None, crawl_pages=8, crawl_seconds=args.deadline)
+        chunks = loader.load_data(root)
+        by_type = {}
+        for c in chunks: by_type[c["type"]] = by_type.get(c["type"], 0) + 1
+        print(f"\nUniversalLoader: {len(chunks)} chunks from {len({c['source'] for c in chunks})} pages {by_type}")
+    srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Offline end-to-end benchmark: runs the real pipeline against local stand-ins.
+
+Nothing here touches the network or needs API keys:
+  - FakeGenaiClient replaces agent.client and answers with deterministic JSON after a configurable delay
+  - a local HTTP server plays the Pexels API (search + image bytes)
+  - StubFetcher serves a canned company website to UniversalLoader
+
+Usage:
+  python benchmarks/e2e.py                          # six one-pagers, batch pipeline
+  python benchmarks/e2e.py --synthetic 50 --scale 4 # 50 generated data rooms, each 4x a one-pager
+  python benchmarks/e2e.py --serial                 # old one-company-at-a-time loop, for comparison
+  python benchmarks/e2e.py --save-baseline          # store results as the baseline later runs compare to
+"""
+import os
+import io
+import re
+import sys
+import json
+import glob
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as app
+from intelligence import AnalysisAgent
+from schema_guard import SectorGuard
+from data_loader import UniversalLoader
+from visual_engine import VisualEngine
+from asset_store import AssetStore
+from ppt_generator import PPTGenerator
+from chunk_vault import ChunkVault
+from llm_cache import ResponseCache
+from http_cache import FetchResult
+from tokens import estimate_tokens
+
+DATA_DIR = os.path.join(ROOT, "IITB-Hackathon", "IITB-Hackathon", "Company Data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+# ---------------------------------------------------------------- stand-ins
+
+class FakeCaches:
+    """Context-cache stand-in: remembers the cached contents so generate_content can prepend them."""
+    def __init__(self):
+        self.store = {}
+
+    def create(self, model, config=None):
+        name = f"cachedContents/{len(self.store)}"
+        self.store[name] = list(config.contents)
+        return SimpleNamespace(name=name, model=model)
+
+class FakeModels:
+    def __init__(self, latency, jitter, invalid_rate=0.0, caches=None, leak_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.invalid_rate = invalid_rate
+        self.leak_rate = leak_rate
+        self.caches = caches
+        self.calls = 0
+        self.prompts = [] # Every prompt as sent, to check nothing unmasked reaches the model
+        self._lock = threading.Lock()
+
+    def list(self):
+        return [SimpleNamespace(name=f"models/{m}") for m in ("gemini-2.0-flash-lite", "gemini-1.5-flash")]
+
+    def _answer(self, contents):
+        text = "\n".join(c if isinstance(c, str) else str(c) for c in contents)
+        if "REPAIR TASK" in text:
+            ask = json.loads(text[text.rindex("OUTPUT JSON:") + 12:].strip())
+            return {"metrics": {k: "12 Cr" for k in ask.get("metrics", {})},
+                    "rewrites": {p: "Established operator" for p in ask.get("rewrites", {})}}
+        ids = re.findall(r"^\[([0-9a-f]+)\] SOURCE", text, re.MULTILINE)
+        m = re.search(r"Sector: ([A-Za-z ]+)\.", text)
+        sector = m.group(1).strip() if m else "General"
+        metrics = {"Revenue (Latest)": "502 Cr", "EBITDA": "48 Cr"}
+        if random.random() < self.invalid_rate:
+            metrics = {"EBITDA": "48 Cr"} # Fails validation; exercises the repair path
+        else:
+            for req in SectorGuard().metric_rules.get(sector, {}).get("required", []):
+                metrics.setdefault(req.replace("_", " ").title().replace(" ", "_"), "N/A")
+        headline = "Diversified operator with export reach"
+        if random.random() < self.leak_rate: headline = "The market leader in its segment" # Semantic leak
+        return {
+            "code_name": "Project X",
+            "sector": sector,
+            "slide_1": {"headline": headline, "sub_headline": "Benchmark output",
+                        "bullets": ["Multi-division portfolio", "Presence in 45 countries", "ISO 9001 certified"]},
+            "slide_2": {"metrics": metrics,
+                        "chart_data": {"years": ["2022", "2023", "2024"], "revenue_values": [401, 410, 502],
+                                       "data_quality": "Actuals"}},
+            "slide_3": {"hooks": ["Steady growth", "Capacity headroom", "Export mix", "Margin recovery"]},
+            "visual_keywords": ["factory", "laboratory", "warehouse"],
+            "citations": [{"id": i, "claim": f"Claim {n}", "source_display": "Internal Doc"}
+                          for n, i in enumerate(ids[:5])],
+        }
+
+    def _respond(self, contents, config):
+        with self._lock: self.calls += 1
+        if isinstance(contents, str): contents = [contents]
+        if config is not None and getattr(config, "cached_content", None):
+            contents = self.caches.store[config.cached_content] + list(contents)
+        with self._lock: self.prompts.append("\n".join(map(str, contents)))
+        body = json.dumps(self._answer(contents))
+        usage = SimpleNamespace(prompt_token_count=sum(estimate_tokens(str(c)) for c in contents),
+                                candidates_token_count=estimate_tokens(body),
+                                total_token_count=None, cached_content_token_count=None)
+        return body, usage
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(max(0, random.gauss(self.latency, self.jitter)))
+        body, usage = self._respond(contents, config)
+        return SimpleNamespace(text=body, usage_metadata=usage)
+
+    def generate_content_stream(self, model, contents, config=None):
+        """Same answer in 64-char pieces; a fifth of the latency passes before the first piece."""
+        total = max(0, random.gauss(self.latency, self.jitter))
+        body, usage = self._respond(contents, config)
+        pieces = [body[i:i + 64] for i in range(0, len(body), 64)]
+        time.sleep(total * 0.2)
+        sent = ""
+        for piece in pieces:
+            time.sleep(total * 0.8 / len(pieces))
+            sent += piece
+            # Like the real API, every chunk reports usage so far
+            yield SimpleNamespace(text=piece, usage_metadata=SimpleNamespace(
+                **{**vars(usage), "candidates_token_count": estimate_tokens(sent)}))
+
+class FakeGenaiClient:
+    def __init__(self, latency=2.0, jitter=0.3, invalid_rate=0.0, leak_rate=0.0):
+        self.caches = FakeCaches()
+        self.models = FakeModels(latency, jitter, invalid_rate, self.caches, leak_rate)
+
+class StubFetcher:
+    """Stands in for CachedFetcher: every URL returns the same small company website."""
+    PAGE = ("<html><body><nav>Home | About</nav><h1>About Us</h1><p>{txt}</p><h2>Investors</h2>"
+            "<p>Annual reports and quarterly results are published for shareholders. {txt}</p>"
+            "<footer>(c) company</footer></body></html>")
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.stats = {"fresh": 0, "revalidated": 0, "downloaded": 0}
+
+    def get(self, url):
+        time.sleep(self.latency)
+        self.stats["downloaded"] += 1
+        if url.endswith(("/robots.txt", "/sitemap.xml")): return FetchResult(url, 404, b"", {})
+        body = self.PAGE.format(txt="We manufacture and export across segments. " * 20).encode()
+        return FetchResult(url, 200, body, {"Content-Type": "text/html"})
+
+def start_pexels_stub(latency):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1880, 1253), (40, 70, 110)).save(buf, "JPEG", quality=90)
+    image = buf.getvalue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            port = self.server.server_port
+            if self.path.startswith("/v1/search"):
+                n = abs(hash(self.path)) % 7
+                alts = ("factory floor", "laboratory glassware", "warehouse shelves", "abstract light", "office desk")
+                body = json.dumps({"photos": [{"alt": alts[(n + k) % len(alts)],
+                                               "src": {"large2x": f"http://127.0.0.1:{port}/img/{n}-{k}.jpg"}}
+                                              for k in range(12)]}).encode()
+            else:
+                body = image
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *a): pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+# ---------------------------------------------------------------- data rooms
+
+def one_pagers():
+    return sorted(glob.glob(os.path.join(DATA_DIR, "*", "*.md")))
+
+def synthetic_rooms(out_dir, count, scale):
+    """Companies built from the real one-pagers, body repeated `scale` times (headers renamed to stay distinct)."""
+    sources = one_pagers()
+    os.makedirs(out_dir, exist_ok=True)
+    for n in range(count):
+        with open(sources[n % len(sources)], "r", encoding="utf-8") as f: text = f.read()
+        parts = [text]
+        for k in range(1, scale):
+            parts.append(re.sub(r"^(#{2,3} .+)$", rf"\1 (Part {k+1})", text, flags=re.MULTILINE))
+        with open(os.path.join(out_dir, f"Synthetic{n:03d}-OnePager.md"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(parts))
+    return out_dir
+
+# ---------------------------------------------------------------- run
+
+def build_components(args, work):
+    loader = UniversalLoader(cache_path=None, http_cache_dir=None)
+    loader.fetcher = StubFetcher(args.web_latency)
+    agent = AnalysisAgent("offline-benchmark", cache=ResponseCache(mode="off"), telemetry_log=None, stream=not args.no_stream)
+    agent.client = FakeGenaiClient(args.llm_latency, args.llm_jitter, args.invalid_rate, args.leak_rate)
+    agent.active_model = "gemini-2.0-flash-lite"
+    srv = start_pexels_stub(args.pexels_latency)
+    visual = VisualEngine("offline", cache_path=None, api_base=f"http://127.0.0.1:{srv.server_port}/v1",
+                          assets=None if args.no_assets else AssetStore(os.path.join(work, "assets")))
+    return loader, agent, visual, srv
+
+def run(args):
+    work = tempfile.mkdtemp(prefix="e2e_bench_")
+    cwd = os.getcwd()
+    try:
+        if args.synthetic:
+            folder = synthetic_rooms(os.path.join(work, "rooms"), args.synthetic, args.scale)
+        else:
+            folder = os.path.join(work, "rooms")
+            os.makedirs(folder)
+            for p in one_pagers(): shutil.copy(p, folder)
+
+        loader, agent, visual, srv = build_components(args, work)
+        vault = ChunkVault(os.path.join(work, "vault.sqlite"))
+        out_dir = os.path.join(work, "out")
+        os.makedirs(out_dir)
+        os.chdir(out_dir) # Decks and citation docs are written to cwd
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        if args.serial:
+            builder = PPTGenerator()
+            results = [app.process_company(os.path.join(folder, f), loader, agent, visual, builder, vault=vault)
+                       for f in sorted(os.listdir(folder))]
+        else:
+            results = app.process_folder(folder, loader, agent, visual, args.workers, args.render_workers,
+                                         vault=vault)
+        wall = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        srv.shutdown()
+
+        outputs = [os.path.join(out_dir, f) for f in os.listdir(out_dir)]
+        names = [re.compile(re.escape(f.split("-OnePager")[0]), re.IGNORECASE) for f in os.listdir(folder)]
+        prompts = agent.client.models.prompts
+        stages = {}
+        for r in results:
+            for k, v in r["timings"].items(): stages.setdefault(k, []).append(v)
+        return {
+            "label": args.label or ("synthetic" if args.synthetic else "one-pagers"),
+            "mode": "serial" if args.serial else "pipeline",
+            "companies": len(results),
+            "succeeded": sum(1 for r in results if r["success"]),
+            "wall_s": round(wall, 3),
+            "stage_total_s": {k: round(sum(v), 3) for k, v in stages.items()},
+            "stage_max_s": {k: round(max(v), 3) for k, v in stages.items()},
+            "py_heap_peak_mb": round(peak / 1e6, 1),
+            "output_bytes": sum(os.path.getsize(p) for p in outputs),
+            "llm_calls": agent.client.models.calls,
+            "llm_tokens_in": sum(c["input_tokens"] for c in agent.cost_tracker.calls),
+            "llm_repairs": sum(1 for c in agent.cost_tracker.calls if c.get("kind") == "repair"),
+            "llm_aborted": sum(1 for c in agent.cost_tracker.calls if c["outcome"].startswith("aborted")),
+            "prompt_name_hits": sum(len(n.findall(p)) for n in names for p in prompts),
+            "image_searches": visual.search_stats["searches"],
+            "image_search_cache_hits": visual.search_stats["cache_hits"],
+            "params": {k: v for k, v in vars(args).items() if k not in ("save_baseline", "label")},
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+def compare(current, baseline):
+    print(f"\nvs baseline ({baseline.get('label')}, {baseline.get('mode')}):")
+    for key in ("wall_s", "py_heap_peak_mb", "output_bytes", "llm_tokens_in"):
+        old, new = baseline.get(key), current.get(key)
+        if old:
+            print(f"  {key:16s} {old:>12} -> {new:>12}  ({(new - old) / old * 100:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic data rooms instead of the one-pagers")
+    parser.add_argument("--scale", type=int, default=1, help="Size multiplier for synthetic rooms")
+    parser.add_argument("--serial", action="store_true", help="Use the one-at-a-time process_company loop")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--render-workers", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Share of LLM answers that fail validation")
+    parser.add_argument("--leak-rate", type=float, default=0.0, help="Share of LLM answers with a leaky headline")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streamed generation")
+    parser.add_argument("--no-assets", action="store_true", help="Download images to temp files, no AssetStore")
+    parser.add_argument("--pexels-latency", type=float, default=0.3)
+    parser.add_argument("--web-latency", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", help="Name stored with the result")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    res = run(args)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "latest.json"), "w") as f: json.dump(res, f, indent=2)
+    print("\n" + "=" * 50)
+    print(json.dumps({k: v for k, v in res.items() if k != "params"}, indent=2))
+    if args.save_baseline:
+        with open(BASELINE, "w") as f: json.dump(res, f, indent=2)
+        print(f"Saved baseline: {BASELINE}")
+    elif os.path.exists(BASELINE):
+        with open(BASELINE) as f: compare(res, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""CLI cold-start time: `import main`, `main.py --help`, and which heavy packages got imported.
+
+Usage: python benchmarks/startup.py [--runs 7]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "numpy", "pypdf", "openpyxl", "bs4", "requests", "google.genai", "pptx", "docx", "PIL", "lxml"]
+
+def timed(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    baseline = timed([sys.executable, "-c", "pass"], args.runs)
+    imp = timed([sys.executable, "-c", "import main"], args.runs)
+    helps = timed([sys.executable, "main.py", "--help"], args.runs)
+    probe = ("import sys, main; print(','.join(m for m in %r if m in sys.modules))" % HEAVY)
+    loaded = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    print(f"interpreter     : {baseline:7.1f} ms")
+    print(f"import main     : {imp:7.1f} ms  (+{imp - baseline:.1f} ms over bare interpreter)")
+    print(f"main.py --help  : {helps:7.1f} ms")
+    print(f"heavy modules loaded by `import main`: {loaded or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+_CORE = ("id", "source", "location", "type", "text")
+
+class ChunkVault:
+    """Persistent store of every company's chunks with an FTS5 full-text index (SQLite).
+
+    Chunk IDs are content-addressed (see UniversalLoader._generate_chunk_id), so a
+    chunk is stored once however many runs or companies reference it; `members`
+    records which chunks make up each company's data room and in what order.
+    Fields beyond the core ones (e.g. an Excel `table`) round-trip through `meta`.
+    """
+    def __init__(self, db_path=".cache/vault.sqlite"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path): os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                rid INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, source TEXT, location TEXT, type TEXT,
+                text TEXT, meta TEXT, added REAL);
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+            CREATE INDEX IF NOT EXISTS chunks_type ON chunks(type);
+            CREATE TABLE IF NOT EXISTS members (
+                company TEXT, id TEXT, position INTEGER, PRIMARY KEY (company, id));
+            CREATE INDEX IF NOT EXISTS members_id ON members(id);
+            CREATE TABLE IF NOT EXISTS companies (company TEXT PRIMARY KEY, updated REAL, website TEXT);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, location, content='chunks', content_rowid='rid');
+        """)
+        # Vaults written before the website column existed
+        if "website" not in {r[1] for r in self.conn.execute("PRAGMA table_info(companies)")}:
+            self.conn.execute("ALTER TABLE companies ADD COLUMN website TEXT")
+        self.conn.commit()
+
+    def _row(self, row):
+        cid, source, location, ctype, text, meta = row
+        chunk = {"id": cid, "text": text, "source": source, "location": location, "type": ctype}
+        if meta: chunk.update(json.loads(meta))
+        return chunk
+
+    def _select(self, where, params=()):
+        with self._lock:
+            rows = self.conn.execute(f"SELECT c.id, c.source, c.location, c.type, c.text, c.meta FROM {where}",
+                                     params).fetchall()
+        return [self._row(r) for r in rows]
+
+    def put(self, company, chunks, website=None):
+        """Stores `chunks` as the current data room of `company` (replacing its previous set) and its website."""
+        now = time.time()
+        with self._lock:
+            for c in chunks:
+                meta = {k: v for k, v in c.items() if k not in _CORE}
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO chunks (id, source, location, type, text, meta, added) VALUES (?,?,?,?,?,?,?)",
+                    (c['id'], c.get('source'), c.get('location'), c.get('type'), c.get('text', ''),
+                     json.dumps(meta, ensure_ascii=False) if meta else None, now))
+                if cur.rowcount:
+                    self.conn.execute("INSERT INTO chunks_fts (rowid, text, location) VALUES (?,?,?)",
+                                      (cur.lastrowid, c.get('text', ''), c.get('location')))
+            old = [r[0] for r in self.conn.execute("SELECT id FROM members WHERE company=?", (company,))]
+            self.conn.execute("DELETE FROM members WHERE company=?", (company,))
+            self.conn.executemany("INSERT OR IGNORE INTO members VALUES (?,?,?)",
+                                  [(company, c['id'], n) for n, c in enumerate(chunks)])
+            self._drop_orphans(old) # Chunks the previous ingest had and no company uses any more
+            self.conn.execute("INSERT OR REPLACE INTO companies VALUES (?,?,?)", (company, now, website))
+            self.conn.commit()
+
+    def get(self, chunk_id):
+        found = self._select("chunks c WHERE c.id=?", (chunk_id,))
+        return found[0] if found else None
+
+    def get_many(self, ids):
+        """{id: chunk} for the IDs that exist."""
+        ids = list(dict.fromkeys(i for i in ids if i))
+        out = {}
+        for n in range(0, len(ids), 500): # Stay under SQLite's bound-parameter limit
+            part = ids[n:n + 500]
+            for c in self._select(f"chunks c WHERE c.id IN ({','.join('?' * len(part))})", part): out[c['id']] = c
+        return out
+
+    def company_chunks(self, company):
+        return self._select("members m JOIN chunks c ON c.id = m.id WHERE m.company=? ORDER BY m.position",
+                            (company,))
+
+    def by_source(self, source):
+        return self._select("chunks c WHERE c.source=? ORDER BY c.rid", (source,))
+
+    def by_type(self, chunk_type, company=None):
+        if company:
+            return self._select("members m JOIN chunks c ON c.id = m.id WHERE m.company=? AND c.type LIKE ? "
+                                "ORDER BY m.position", (company, f"%{chunk_type}%"))
+        return self._select("chunks c WHERE c.type LIKE ? ORDER BY c.rid", (f"%{chunk_type}%",))
+
+    def website(self, company):
+        """The website stored with `company`'s data room, if any (re-analysis masks it like a fresh ingest)."""
+        with self._lock:
+            row = self.conn.execute("SELECT website FROM companies WHERE company=?", (company,)).fetchone()
+        return row[0] if row else None
+
+    def companies(self):
+        with self._lock: return [r[0] for r in self.conn.execute("SELECT company FROM companies ORDER BY company")]
+
+    def search(self, query, company=None, limit=20):
+        """Full-text search (FTS5 bm25 order) across the portfolio, or one company; returns chunks + `company`.
+
+        A chunk shared by several companies comes back once, with their names comma-joined.
+        """
+        terms = [t.replace('"', '') for t in query.split() if t.replace('"', '')]
+        if not terms: return []
+        match = " ".join(f'"{t}"' for t in terms) # Quoted terms: user text is never parsed as FTS syntax
+        if company:
+            owner, where = "?", " AND EXISTS (SELECT 1 FROM members m WHERE m.id = c.id AND m.company=?)"
+            params = [company, match, company, limit]
+        else:
+            owner, where = "(SELECT group_concat(m.company, ', ') FROM members m WHERE m.id = c.id)", ""
+            params = [match, limit]
+        sql = (f"SELECT c.id, c.source, c.location, c.type, c.text, c.meta, {owner} FROM chunks_fts f "
+               f"JOIN chunks c ON c.rid = f.rowid WHERE chunks_fts MATCH ?{where} ORDER BY bm25(chunks_fts) LIMIT ?")
+        with self._lock: rows = self.conn.execute(sql, params).fetchall()
+        return [dict(self._row(r[:6]), company=r[6]) for r in rows]
+
+    def _drop_orphans(self, ids=None):
+        """Deletes chunks (all, or among `ids`) no company references; caller holds the lock and commits."""
+        sql = "SELECT rid, text, location FROM chunks WHERE id NOT IN (SELECT id FROM members)"
+        orphans = []
+        if ids is None: orphans = self.conn.execute(sql).fetchall()
+        for n in range(0, len(ids or ()), 500):
+            part = ids[n:n + 500]
+            orphans += self.conn.execute(sql + f" AND id IN ({','.join('?' * len(part))})", part).fetchall()
+        for rid, text, location in orphans:
+            self.conn.execute("INSERT INTO chunks_fts (chunks_fts, rowid, text, location) VALUES ('delete',?,?,?)",
+                              (rid, text, location))
+            self.conn.execute("DELETE FROM chunks WHERE rid=?", (rid,))
+        return len(orphans)
+
+    def prune(self):
+        """Deletes chunks no company references any more; returns how many went (put() prunes its own)."""
+        with self._lock:
+            n = self._drop_orphans()
+            self.conn.commit()
+        return n
@@ -0,0 +1,103 @@
+import re
+from tokens import estimate_tokens
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+class Piece:
+    """One packed chunk: its text and the refs (line/row/page/paragraph markers) of the units in it."""
+    __slots__ = ("text", "refs", "tokens")
+
+    def __init__(self, text, refs, tokens):
+        self.text = text
+        self.refs = refs
+        self.tokens = tokens
+
+class Chunker:
+    """Token-aware packer every UniversalLoader reader feeds.
+
+    Readers hand over units (a line, table row, paragraph, page paragraph) as
+    (text, ref) pairs; units are packed in order until the next one would pass
+    `target_tokens`. Consecutive prose pieces share `overlap_tokens` of trailing
+    units; table windows use overlap=0 and repeat their header via `prefix`
+    instead. A unit bigger than the target is split at sentences, then words;
+    nothing is ever truncated. Tokens are estimated locally (tokens.py).
+    Only the current window is held, so a generator of units streams through.
+    """
+    def __init__(self, target_tokens=800, overlap_tokens=80):
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _split_unit(self, text, budget):
+        """Pieces of one oversized unit, each within `budget` (sentences first, words if needed)."""
+        parts, cur, cur_tok = [], [], 0
+        sentences = _SENTENCE.split(text)
+        atoms = []
+        for s in sentences:
+            if estimate_tokens(s) <= budget: atoms.append(s)
+            else: atoms.extend(s.split(" "))
+        for a in atoms:
+            t = estimate_tokens(a)
+            if cur and cur_tok + t > budget:
+                parts.append(" ".join(cur))
+                cur, cur_tok = [], 0
+            cur.append(a)
+            cur_tok += t
+        if cur: parts.append(" ".join(cur))
+        return parts
+
+    def window(self, prefix="", overlap=None, sep="\n"):
+        """Incremental packer for readers that drive their own loop (see Window)."""
+        return Window(self, prefix, self.overlap_tokens if overlap is None else overlap, sep)
+
+    def pack(self, units, prefix="", overlap=None, sep="\n"):
+        """Yields Piece objects for an iterable of (text, ref) units."""
+        win = self.window(prefix, overlap, sep)
+        for text, ref in units:
+            for p in win.add(text, ref): yield p
+        for p in win.close(): yield p
+
+def sentences(text):
+    return [s for s in _SENTENCE.split(text) if s.strip()]
+
+class Window:
+    """The open chunk of a Chunker: add() units, collect the Pieces that fill up, close() at the end."""
+    def __init__(self, chunker, prefix, overlap, sep):
+        self.chunker = chunker
+        self.prefix = prefix
+        self.overlap = overlap
+        self.sep = sep
+        self.head_tok = estimate_tokens(prefix) if prefix else 0
+        self.budget = max(1, chunker.target_tokens - self.head_tok)
+        self.units, self.used, self.fresh = [], 0, 0 # units: [(text, ref, tokens)]; fresh: not yet emitted
+
+    def _emit(self):
+        body = self.sep.join(t for t, _, _ in self.units)
+        return Piece(self.prefix + self.sep + body if self.prefix else body,
+                     [r for _, r, _ in self.units], self.head_tok + self.used)
+
+    def add(self, text, ref):
+        out = []
+        t = estimate_tokens(text)
+        parts = [(text, t)] if t <= self.budget else [
+            (p, estimate_tokens(p)) for p in self.chunker._split_unit(text, self.budget)]
+        for ptext, ptok in parts:
+            if self.units and self.used + ptok > self.budget:
+                if self.fresh: out.append(self._emit())
+                # Carry the tail forward as overlap (never the whole window), as far as it still fits
+                keep, kept = [], 0
+                for u in reversed(self.units[1:] if self.fresh else ()):
+                    if kept + u[2] > self.overlap: break
+                    keep.insert(0, u)
+                    kept += u[2]
+                while keep and kept + ptok > self.budget: kept -= keep.pop(0)[2]
+                self.units, self.used, self.fresh = keep, kept, 0
+            self.units.append((ptext, ref, ptok))
+            self.used += ptok
+            self.fresh += 1
+        return out
+
+    def close(self):
+        done = self.fresh and any(t.strip() for t, _, _ in self.units)
+        out = [self._emit()] if done else []
+        self.units, self.used, self.fresh = [], 0, 0
+        return out
@@ -0,0 +1,126 @@
+import re
+import math
+from collections import Counter, defaultdict
+from tokens import estimate_tokens
+
+_TERM = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return _TERM.findall(text.lower())
+
+class BM25Index:
+    """In-memory Okapi BM25 over a list of documents (inverted index, no deps)."""
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.k1, self.b = k1, b
+        self.postings = defaultdict(list) # term -> [(doc_idx, tf)]
+        self.doc_len = []
+        for i, doc in enumerate(docs):
+            terms = tokenize(doc)
+            self.doc_len.append(len(terms))
+            for t, tf in Counter(terms).items(): self.postings[t].append((i, tf))
+        self.n = len(docs)
+        self.avgdl = (sum(self.doc_len) / self.n) if self.n else 0
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query):
+        out = [0.0] * self.n
+        for term in set(tokenize(query)):
+            idf = self.idf(term)
+            for i, tf in self.postings.get(term, ()):
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[i] / (self.avgdl or 1))
+                out[i] += idf * tf * (self.k1 + 1) / norm
+        return out
+
+class ContextBuilder:
+    """Picks the most relevant chunks per output section under a token budget."""
+    SECTIONS = {
+        "slide_1": ("business description overview products services portfolio division certifications iso gmp "
+                    "who fda customers clients exports countries presence", 0.30),
+        "slide_2": ("revenue operations ebitda ebit pat profit margin income statement financials turnover "
+                    "growth sales fy crore million", 0.35),
+        "slide_3": ("growth opportunity strengths expansion capacity order book market size partners awards "
+                    "future plan milestones patents", 0.25),
+        "citations": ("company founded incorporated history headquarters facilities plant leadership "
+                      "shareholders ownership", 0.10),
+    }
+    NAIVE_MAX_CHARS = 1000000 # What the old dump sent
+    NAIVE_CHUNK_CHARS = 40000 # ... with each chunk's text cut to this
+
+    def __init__(self, token_budget=24000):
+        self.token_budget = token_budget
+
+    def _entry(self, c):
+        return f"[{c['id']}] SOURCE: {c['source']} ({c['location']})\n{c['text']}\n\n"
+
+    def naive_tokens(self, chunks):
+        """Estimated tokens of the legacy prompt dump (the "saved" baseline), assembled the way it was."""
+        # The header counts toward the legacy char cap; its tokens are left out here as in build()'s total
+        total, n_chars = 0, len("DATA VAULT (Cite these IDs):\n")
+        for c in sorted(chunks, key=lambda c: 3 if 'financial' in c['type'] else 1, reverse=True):
+            entry = self._entry(dict(c, text=c['text'][:self.NAIVE_CHUNK_CHARS]))
+            if n_chars + len(entry) > self.NAIVE_MAX_CHARS: break
+            n_chars += len(entry)
+            total += estimate_tokens(entry)
+        return total
+
+    def focused(self, chunks, query, token_budget=2000):
+        """Best BM25 matches for `query` under a small budget (repair calls); returns (context_str, ids)."""
+        index = BM25Index([f"{c['location']} {c['text']}" for c in chunks])
+        scores = index.scores(query)
+        out, ids, used = [], set(), 0
+        for i in sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True):
+            if scores[i] <= 0: break
+            entry = self._entry(chunks[i])
+            cost = estimate_tokens(entry)
+            if used + cost > token_budget: continue
+            out.append(entry)
+            ids.add(chunks[i]['id'])
+            used += cost
+        return "EXCERPTS (Cite these IDs):\n" + "".join(out), ids
+
+    def build(self, chunks):
+        """Returns (context_str, included_ids, report)."""
+        entries = [self._entry(c) for c in chunks]
+        costs = [estimate_tokens(e) for e in entries]
+        naive = self.naive_tokens(chunks)
+        picked = {} # chunk idx -> section
+
+        if sum(costs) <= self.token_budget:
+            for i in range(len(chunks)): picked[i] = "all"
+        else:
+            index = BM25Index([f"{c['location']} {c['text']}" for c in chunks])
+            used = 0
+            ranked = {}
+            for sec, (query, share) in self.SECTIONS.items():
+                scores = index.scores(query)
+                if sec == "slide_2":
+                    scores = [s * 1.5 if 'financial' in c['type'] else s for s, c in zip(scores, chunks)]
+                ranked[sec] = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+                ranked[sec] = [i for i in ranked[sec] if scores[i] > 0]
+                sec_budget, sec_used = self.token_budget * share, 0
+                for i in ranked[sec]:
+                    if i in picked: continue
+                    if sec_used + costs[i] > sec_budget or used + costs[i] > self.token_budget: continue
+                    picked[i] = sec
+                    sec_used += costs[i]
+                    used += costs[i]
+            # Unused share rolls over to the best remaining chunk of any section
+            best_rank = {}
+            for r in ranked.values():
+                for pos, i in enumerate(r): best_rank[i] = min(pos, best_rank.get(i, pos))
+            for i in sorted(best_rank, key=best_rank.get):
+                if i not in picked and used + costs[i] <= self.token_budget:
+                    picked[i] = "extra"
+                    used += costs[i]
+
+        order = {sec: n for n, sec in enumerate(list(self.SECTIONS) + ["extra", "all"])}
+        context_str = "DATA VAULT (Cite these IDs):\n" + "".join(
+            entries[i] for i in sorted(picked, key=lambda i: order[picked[i]]))
+
+        used = sum(costs[i] for i in picked)
+        report = {"chunks_used": len(picked), "chunks_total": len(chunks), "tokens_used": used,
+                  "naive_tokens": naive, "tokens_saved": max(0, naive - used)}
+        return context_str, {chunks[i]['id'] for i in picked}, report
@@ -0,0 +1,152 @@
+import re
+import time
+import heapq
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.robotparser import RobotFileParser
+
+_HREF = re.compile(r"""href\s*=\s*["']([^"'#>]+)""", re.IGNORECASE)
+_LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+_SKIP_EXT = re.compile(r"\.(?:jpe?g|png|gif|svg|webp|ico|css|js|zip|rar|mp4|mp3|woff2?|ttf|xml|pdf|docx?|xlsx?|pptx?)$",
+                       re.IGNORECASE)
+
+class SiteCrawler:
+    """Bounded async crawl of one company website through a CachedFetcher.
+
+    Seeds from the start URL plus sitemap.xml (and any Sitemap: lines in robots.txt),
+    obeys robots.txt, and always fetches the most promising URL next: paths mentioning
+    investor / financial / about pages first, then shallower ones. Fetches go through
+    the loader's CachedFetcher on a private thread pool (HTTP cache, pooling and
+    revalidation are reused; an abandoned fetch never holds up the deadline), at most
+    `per_host` in flight. The crawl stops at `max_pages` HTML pages, `max_depth` link
+    hops or `deadline` seconds, whichever comes first.
+    """
+    PRIORITY_TERMS = {"investor": 5, "financial": 5, "annual-report": 4, "annual": 3, "results": 3,
+                      "shareholder": 3, "about": 4, "company": 2, "overview": 2, "profile": 2, "history": 1}
+
+    def __init__(self, fetcher, max_pages=12, max_depth=2, per_host=4, deadline=20.0, user_agent="*",
+                 max_sitemap_urls=500):
+        self.fetcher = fetcher
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.per_host = per_host
+        self.deadline = deadline
+        self.user_agent = user_agent
+        self.max_sitemap_urls = max_sitemap_urls
+        self.stats = {}
+
+    def _host(self, url):
+        host = (urlparse(url).hostname or "").lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def _normalize(self, url):
+        url = urldefrag(url)[0]
+        p = urlparse(url)
+        if p.scheme not in ("http", "https"): return None
+        return url.rstrip("/") if p.path not in ("", "/") else f"{p.scheme}://{p.netloc}/"
+
+    def score(self, url):
+        """Lower crawls first."""
+        path = urlparse(url).path.lower()
+        return -sum(w for term, w in self.PRIORITY_TERMS.items() if term in path)
+
+    async def _get(self, url, sem):
+        async with sem:
+            try: return await asyncio.get_running_loop().run_in_executor(self._pool, self.fetcher.get, url)
+            except Exception: return None
+
+    async def _robots(self, root, sem):
+        rp = RobotFileParser()
+        res = await self._get(urljoin(root, "/robots.txt"), sem)
+        text = res.content.decode("utf-8", "ignore") if res is not None and res.status_code == 200 else ""
+        rp.parse(text.splitlines()) # Missing/unreadable robots.txt allows everything
+        sitemaps = re.findall(r"(?im)^\s*sitemap:\s*(\S+)", text)
+        return rp, sitemaps
+
+    async def _sitemap_urls(self, root, listed, sem):
+        queue, seen, found = list(listed) or [urljoin(root, "/sitemap.xml")], set(), []
+        while queue and len(seen) < 5 and len(found) < self.max_sitemap_urls:
+            sm = queue.pop(0)
+            if sm in seen: continue
+            seen.add(sm)
+            res = await self._get(sm, sem)
+            if res is None or res.status_code != 200: continue
+            for loc in _LOC.findall(res.content.decode("utf-8", "ignore")):
+                (queue if loc.lower().endswith(".xml") else found).append(loc) # Sitemap index -> nested maps
+        return found[:self.max_sitemap_urls]
+
+    def _allowed(self, url, host, rp):
+        return (self._host(url) == host and not _SKIP_EXT.search(urlparse(url).path)
+                and rp.can_fetch(self.user_agent, url))
+
+    async def _crawl(self, start_url):
+        t0 = time.monotonic()
+        start = self._normalize(start_url)
+        host = self._host(start)
+        sem = asyncio.Semaphore(self.per_host)
+        stats = {"fetched": 0, "pages": 0, "timed_out": False}
+        try:
+            rp, listed = await asyncio.wait_for(self._robots(start, sem), self.deadline / 4)
+        except asyncio.TimeoutError:
+            rp, listed = RobotFileParser(), []
+            rp.parse([])
+        delay = min(float(rp.crawl_delay(self.user_agent) or 0), 5.0)
+
+        order, dispatched = itertools.count(), itertools.count()
+        frontier, seen = [], {start}
+        def push(url, depth):
+            heapq.heappush(frontier, (self.score(url), depth, next(order), url))
+        if rp.can_fetch(self.user_agent, start): push(start, 0)
+        try:
+            seeds = await asyncio.wait_for(self._sitemap_urls(start, listed, sem), self.deadline / 4)
+        except asyncio.TimeoutError:
+            seeds = []
+        for u in seeds:
+            u = self._normalize(u)
+            if u and u not in seen and self._allowed(u, host, rp):
+                seen.add(u)
+                push(u, 1)
+
+        pages, in_flight = [], {}
+        while frontier or in_flight:
+            remaining = self.deadline - (time.monotonic() - t0)
+            if remaining <= 0:
+                stats["timed_out"] = True
+                break
+            # Fill the free slots with the best URLs found so far
+            while frontier and len(in_flight) < self.per_host and len(pages) + len(in_flight) < self.max_pages:
+                _, depth, _, url = heapq.heappop(frontier)
+                in_flight[asyncio.ensure_future(self._get(url, sem))] = (url, depth, next(dispatched))
+                if delay: await asyncio.sleep(delay)
+            if not in_flight: break
+            done, _ = await asyncio.wait(in_flight, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url, depth, n = in_flight.pop(task)
+                res = task.result()
+                stats["fetched"] += 1
+                if res is None or res.status_code != 200: continue
+                ctype = (res.headers or {}).get("Content-Type") or "text/html"
+                if "html" not in ctype.lower(): continue
+                pages.append((n, url, res))
+                if depth >= self.max_depth: continue
+                html = res.content.decode("utf-8", "ignore") if isinstance(res.content, bytes) else res.content
+                for href in _HREF.findall(html):
+                    u = self._normalize(urljoin(url, href.strip()))
+                    if u and u not in seen and self._allowed(u, host, rp):
+                        seen.add(u)
+                        push(u, depth + 1)
+        for task in in_flight: task.cancel() # Threads finish on their own; results are dropped
+        stats["pages"] = len(pages)
+        stats["seconds"] = round(time.monotonic() - t0, 2)
+        self.stats[start] = stats
+        return [(url, res) for _, url, res in sorted(pages, key=lambda p: p[0])] # Dispatch order, not arrival
+
+    def crawl(self, start_url):
+        """[(url, FetchResult)] for up to max_pages HTML pages in crawl order; safe to call from worker threads."""
+        self._pool = ThreadPoolExecutor(max_workers=self.per_host, thread_name_prefix="crawl")
+        try:
+            return asyncio.run(self._crawl(start_url))
+        finally:
+            self._pool.shutdown(wait=False, cancel_futures=True)
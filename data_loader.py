@@ -1,32 +1,82 @@
 import os
 import re
-import pandas as pd
-from pypdf import PdfReader
-import requests
-from bs4 import BeautifulSoup
+import importlib.util
 import warnings
 import unicodedata
 import hashlib
-import urllib3
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from doc_cache import ChunkCache
+from http_cache import HttpCache, CachedFetcher
+from chunker import Chunker, sentences
+from crawler import SiteCrawler
+from html_sections import extract_sections
+from financials import year_of, to_number
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Format readers (pypdf, openpyxl, lxml, python-docx) are imported by the reader that needs them,
+# so a markdown-only run never pays for the PDF/Excel/HTML stack.
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
-try:
-    from docx import Document
-    HAS_DOCX = True
-except ImportError:
-    HAS_DOCX = False
+HAS_DOCX = importlib.util.find_spec("docx") is not None
+
+# Bump whenever a reader's output changes so cached chunks get re-parsed
+PARSER_VERSION = "5"
+
+_MD_HEADER = re.compile(r"^#{1,3}\s+(.*\S)")
+_MD_TABLE_SEP = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+
+def _extract_pdf_pages(file_path, start, end):
+    """Worker-process side of _iter_pdf: raw text + extraction time for pages [start, end)."""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    out = []
+    for i in range(start, end):
+        t0 = time.perf_counter()
+        try: text = reader.pages[i].extract_text() or ""
+        except Exception: text = ""
+        out.append((i, text, time.perf_counter() - t0))
+    return out
+
+class PartialRead(list):
+    """Chunks from a reader that failed partway: still used for this run, never written to the doc cache."""
 
 class UniversalLoader:
-    def __init__(self):
+    def __init__(self, cache_path=".cache/chunks.sqlite", http_cache_dir=".cache/http", http_ttl=6 * 3600,
+                 chunk_tokens=800, chunk_overlap=80, crawl_pages=12, crawl_depth=2, crawl_seconds=20.0):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
         }
+        # Parsed-chunk cache for local files; None disables it
+        self.page_timings = {} # filename -> [(page_no, seconds)] from the last PDF extraction
+        self.pdf_pages_per_task = 16
+        self.pdf_workers = max(1, (os.cpu_count() or 2) - 1)
+        # Every reader feeds this one packer, so chunk sizes are predictable whatever the format
+        self.chunker = Chunker(chunk_tokens, chunk_overlap)
+        version = f"{PARSER_VERSION}:{chunk_tokens}:{chunk_overlap}"
+        self.doc_cache = ChunkCache(cache_path, version=version) if cache_path else None
+        # One pooled session for every scrape; responses revalidated via ETag/Last-Modified
+        http_cache = HttpCache(http_cache_dir, ttl=http_ttl) if http_cache_dir else None
+        self.fetcher = CachedFetcher(cache=http_cache, headers=self.headers, timeout=15, verify=False)
+        # Website budget per company: crawl_pages=1 scrapes only the given URL
+        self.crawl_pages = crawl_pages
+        self.crawl_depth = crawl_depth
+        self.crawl_seconds = crawl_seconds
 
     def _generate_chunk_id(self, content, source, location):
-        unique_str = f"{source}-{location}-{content[:20]}"
-        return hashlib.md5(unique_str.encode()).hexdigest()[:8]
+        # Content-addressed over the whole text: same chunk -> same ID across runs, no prefix collisions.
+        # 80 bits keeps the IDs short in the prompt while staying collision-free at portfolio scale.
+        unique_str = f"{source}\x00{location}\x00{content}"
+        return hashlib.sha256(unique_str.encode('utf-8')).hexdigest()[:20]
+
+    def _chunk(self, text, source, location, c_type):
+        return {"id": self._generate_chunk_id(text, source, location), "text": text, "source": source,
+                "location": location, "type": c_type}
+
+    def _span(self, label, refs):
+        """'Pages 3-4' / 'Page 3' style location for the refs a piece covers."""
+        lo, hi = refs[0], refs[-1]
+        return f"{label} {lo}" if lo == hi else f"{label}s {lo}-{hi}"
 
     def _clean_text(self, text):
         if not text: return ""
@@ -38,7 +88,88 @@ class UniversalLoader:
         text = re.sub(r'[ \t]+', ' ', text)
         return text.strip()
 
+    def _year_of(self, cell):
+        return year_of(cell)
+
+    def _to_number(self, cell):
+        return to_number(cell)
+
+    def _md_row(self, cells):
+        return "| " + " | ".join("" if c is None else str(c).replace("|", "/").replace("\n", " ") for c in cells) + " |"
+
+    def _excel_window_chunk(self, filename, sheet_name, header, rows, first_row, last_row, financial):
+        # Drop columns that are empty in both header and this window
+        keep = [j for j in range(len(header)) if header[j] is not None or any(j < len(r) and r[j] is not None for r in rows)]
+        h = [header[j] for j in keep]
+        lines = [self._md_row(h), "|" + "---|" * len(h)]
+        lines += [self._md_row([r[j] if j < len(r) else None for j in keep]) for r in rows]
+        text = "\n".join(lines)
+        loc = f"Sheet: {sheet_name} (rows {first_row}-{last_row})"
+        chunk = {
+            "id": self._generate_chunk_id(text, filename, loc),
+            "text": text,
+            "source": filename,
+            "location": loc,
+            "type": "private_excel_financial" if financial else "private_excel_generic"
+        }
+        if financial:
+            # Typed years x line items view of this window, so nobody has to re-parse the markdown
+            years = {j: self._year_of(c) for j, c in enumerate(header)}
+            year_cols = [(j, y) for j, y in years.items() if y]
+            if year_cols:
+                items = {}
+                for r in rows:
+                    label = next((str(c).strip() for c in r if isinstance(c, str) and c.strip()), None)
+                    vals = [self._to_number(r[j]) if j < len(r) else None for j, _ in year_cols]
+                    if label and any(v is not None for v in vals): items[label] = vals
+                if items: chunk["table"] = {"years": [y for _, y in year_cols], "line_items": items}
+        return chunk
+
+    def _excel_piece(self, filename, sheet_name, header, piece, financial):
+        rows = [r for _, r in piece.refs]
+        return self._excel_window_chunk(filename, sheet_name, header, rows, piece.refs[0][0], piece.refs[-1][0], financial)
+
+    def iter_excel(self, file_path):
+        """Streams each sheet (openpyxl read-only) as token-sized row windows, header row repeated in every window."""
+        filename = os.path.basename(file_path)
+        from openpyxl import load_workbook
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                sheet_name = ws.title
+                lower_name = sheet_name.lower()
+                financial = any(x in lower_name for x in ['balance', 'p&l', 'profit', 'financial'])
+                header, win = None, None
+                for n, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                    if not row or all(c is None or str(c).strip() == "" for c in row): continue
+                    if header is None:
+                        header = list(row)
+                        # Year headers mark a statement sheet even when its name doesn't
+                        if sum(1 for c in header if self._year_of(c)) >= 2 and any(
+                                isinstance(c, str) and re.search(r'revenue|ebitda|profit|sales', c, re.I) for c in header):
+                            financial = True
+                        win = self.chunker.window(prefix=self._md_row(header), overlap=0)
+                        continue
+                    for p in win.add(self._md_row(row), (n, list(row))):
+                        yield self._excel_piece(filename, sheet_name, header, p, financial)
+                if win:
+                    for p in win.close(): yield self._excel_piece(filename, sheet_name, header, p, financial)
+        finally:
+            wb.close()
+
     def _read_excel(self, file_path):
+        if file_path.lower().endswith('.xls'): return self._read_excel_legacy(file_path)
+        chunks = []
+        try:
+            for chunk in self.iter_excel(file_path): chunks.append(chunk)
+        except Exception as e:
+            print(f"❌ Error reading Excel {file_path}: {e}")
+            chunks = PartialRead(chunks)
+        return chunks
+
+    def _read_excel_legacy(self, file_path):
+        """Old binary .xls (openpyxl can't open it): whole-sheet pandas path."""
+        import pandas as pd
         chunks = []
         filename = os.path.basename(file_path)
         try:
@@ -48,99 +179,148 @@ class UniversalLoader:
                 df = df.dropna(how='all').dropna(axis=1, how='all')
                 text_content = df.to_markdown(index=False)
                 if not text_content or len(text_content) < 10: continue
+                lines = text_content.split("\n")
 
                 lower_name = sheet_name.lower()
                 chunk_type = "private_excel_generic"
                 if any(x in lower_name for x in ['balance', 'p&l', 'profit', 'financial']):
                     chunk_type = "private_excel_financial"
 
-                chunks.append({
-                    "id": self._generate_chunk_id(text_content, filename, sheet_name),
-                    "text": text_content,
-                    "source": filename,
-                    "location": f"Sheet: {sheet_name}",
-                    "type": chunk_type
-                })
+                rows = ((line, n) for n, line in enumerate(lines[2:], start=2)) # Row 1 is the header
+                for p in self.chunker.pack(rows, prefix="\n".join(lines[:2]), overlap=0):
+                    loc = f"Sheet: {sheet_name} (rows {p.refs[0]}-{p.refs[-1]})"
+                    chunks.append(self._chunk(p.text, filename, loc, chunk_type))
         except Exception as e:
             print(f"❌ Error reading Excel {file_path}: {e}")
+            chunks = PartialRead(chunks)
         return chunks
 
+    def _pdf_page_batches(self, file_path):
+        """Yields [(page_idx, raw_text, seconds)] in page order, fanning ranges out to a process pool.
+
+        At most two ranges per worker are in flight, so memory stays bounded by the
+        window rather than the document size.
+        """
+        from pypdf import PdfReader
+        n_pages = len(PdfReader(file_path).pages)
+        step = self.pdf_pages_per_task
+        ranges = [(s, min(s + step, n_pages)) for s in range(0, n_pages, step)]
+        if len(ranges) <= 1 or self.pdf_workers <= 1:
+            for start, end in ranges: yield _extract_pdf_pages(file_path, start, end)
+            return
+
+        # Spawned: the loader runs inside the pipeline's thread pool, and a forked child can inherit held locks
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.pdf_workers, len(ranges)), mp_context=ctx) as pool:
+            window = self.pdf_workers * 2
+            pending = [pool.submit(_extract_pdf_pages, file_path, *r) for r in ranges[:window]]
+            nxt = len(pending)
+            while pending:
+                batch = pending.pop(0).result()
+                if nxt < len(ranges):
+                    pending.append(pool.submit(_extract_pdf_pages, file_path, *ranges[nxt]))
+                    nxt += 1
+                yield batch
+
+    def iter_pdf(self, file_path):
+        """Streaming PDF reader: page lines go through the chunker as soon as their range is extracted.
+
+        Raw page text stays bounded by the extraction window only for callers that consume
+        this generator; load_data() still collects the document's chunks into a list (for
+        dedup, the doc cache and the vault), so the pipeline holds every chunk of a PDF.
+        """
+        filename = os.path.basename(file_path)
+        timings = self.page_timings[filename] = []
+        win = self.chunker.window()
+        for batch in self._pdf_page_batches(file_path):
+            for i, raw, secs in batch:
+                timings.append((i + 1, secs))
+                for line in self._clean_text(raw).split("\n"):
+                    for p in win.add(line, i + 1): yield self._pdf_piece(filename, p)
+        for p in win.close(): yield self._pdf_piece(filename, p)
+        slow = sorted((t for t in timings if t[1] > 2.0), key=lambda t: -t[1])[:5]
+        if slow:
+            print(f"🐢 Slow PDF pages in {filename}: " + ", ".join(f"p{p} {sec:.1f}s" for p, sec in slow))
+
+    def _pdf_piece(self, filename, piece):
+        return self._chunk(piece.text.strip(), filename, self._span("Page", piece.refs), "private_pdf")
+
     def _read_pdf(self, file_path):
         chunks = []
-        filename = os.path.basename(file_path)
         try:
-            reader = PdfReader(file_path)
-            for i, page in enumerate(reader.pages):
-                text = self._clean_text(page.extract_text())
-                if len(text) > 20:
-                    loc = f"Page {i+1}"
-                    chunks.append({
-                        "id": self._generate_chunk_id(text, filename, loc),
-                        "text": text,
-                        "source": filename,
-                        "location": loc,
-                        "type": "private_pdf"
-                    })
+            for chunk in self.iter_pdf(file_path): chunks.append(chunk)
         except Exception as e:
             print(f"❌ Error reading PDF {file_path}: {e}")
+            chunks = PartialRead(chunks)
         return chunks
 
+    def _md_type(self, header):
+        h_low = header.lower()
+        if any(x in h_low for x in ['financial', 'revenue', 'profit', 'p&l', 'balance']):
+            return "private_text_financial" # High priority!
+        if any(x in h_low for x in ['about', 'profile', 'business']): return "private_text_about"
+        return "private_text_generic"
+
+    def iter_markdown(self, file_path):
+        """Line-streaming markdown reader: each #/##/### section goes through the chunker.
+
+        Prose lines are packed with overlap; pipe tables (recognised by their separator row)
+        get their own windows with the header and separator repeated and no overlap.
+        Locations carry exact line ranges. Only the open window is held in memory.
+        """
+        filename = os.path.basename(file_path)
+        header, win, in_table, pending = "Intro", self.chunker.window(), False, None # pending: possible table header
+
+        def emit(pieces):
+            for p in pieces:
+                text = p.text.strip()
+                if len(text) > 20:
+                    loc = f"Section: {header} (lines {p.refs[0]}-{p.refs[-1]})"
+                    yield self._chunk(text, filename, loc, self._md_type(header))
+
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for n, line in enumerate(f, start=1):
+                line = self._clean_text(line)
+                if pending:
+                    if _MD_TABLE_SEP.match(line): # Separator row confirmed the table
+                        yield from emit(win.close())
+                        win, in_table, pending = self.chunker.window(prefix=pending[1] + "\n" + line, overlap=0), True, None
+                        continue
+                    yield from emit(win.add(pending[1], pending[0])) # A lone pipe line after all
+                    pending = None
+
+                m = _MD_HEADER.match(line)
+                if m:
+                    yield from emit(win.close())
+                    header, win, in_table = m.group(1).strip(), self.chunker.window(), False
+                    continue
+                if in_table and not line.startswith("|"):
+                    yield from emit(win.close())
+                    win, in_table = self.chunker.window(), False
+                if not in_table and line.startswith("|"):
+                    pending = (n, line)
+                    continue
+                if not line and not win.units: continue
+                yield from emit(win.add(line, n))
+            if pending: yield from emit(win.add(pending[1], pending[0]))
+            yield from emit(win.close())
+
     def _read_markdown(self, file_path):
         """Intelligent Markdown Splitter."""
-        chunks = []
-        filename = os.path.basename(file_path)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Split by headers (Line starting with #)
-            sections = re.split(r'(^|\n)#{1,3}\s+', content)
-            
-            current_chunk = ""
-            current_header = "Intro"
-            
-            for part in sections:
-                if not part.strip(): continue
-                
-                # Heuristic: If it's short and looks like a title, it's a header
-                if len(part) < 100 and '\n' not in part.strip():
-                    current_header = part.strip()
-                    continue
-                
-                text = self._clean_text(part)
-                if len(text) > 20:
-                    # Determine type based on header
-                    c_type = "private_text_generic"
-                    h_low = current_header.lower()
-                    if any(x in h_low for x in ['financial', 'revenue', 'profit', 'p&l', 'balance']):
-                        c_type = "private_text_financial" # High priority!
-                    elif any(x in h_low for x in ['about', 'profile', 'business']):
-                        c_type = "private_text_about"
-
-                    chunks.append({
-                        "id": self._generate_chunk_id(text, filename, current_header),
-                        "text": text,
-                        "source": filename,
-                        "location": f"Section: {current_header}",
-                        "type": c_type
-                    })
+            return list(self.iter_markdown(file_path))
         except Exception as e:
             print(f"❌ Error reading Markdown: {e}")
             # Fallback
             return self._read_text_fallback(file_path)
-        return chunks
 
     def _read_text_fallback(self, file_path):
+        filename = os.path.basename(file_path)
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                t = self._clean_text(f.read())
-                return [{
-                    "id": self._generate_chunk_id(t, os.path.basename(file_path), "Full"),
-                    "text": t,
-                    "source": os.path.basename(file_path),
-                    "location": "Full Text",
-                    "type": "private_text"
-                }]
+                lines = ((self._clean_text(line), n) for n, line in enumerate(f, start=1))
+                return [self._chunk(p.text.strip(), filename, self._span("Line", p.refs), "private_text")
+                        for p in self.chunker.pack(lines) if p.text.strip()]
         except: return []
 
     def _read_word(self, file_path):
@@ -148,80 +328,71 @@ class UniversalLoader:
         if not HAS_DOCX: return chunks
         filename = os.path.basename(file_path)
         try:
+            from docx import Document
             doc = Document(file_path)
-            current_chunk = ""
-            start_idx = 0
-            for i, para in enumerate(doc.paragraphs):
-                text = self._clean_text(para.text)
-                if text:
-                    current_chunk += text + "\n"
-                if len(current_chunk) > 1000:
-                    loc = f"Para {start_idx}-{i}"
-                    chunks.append({
-                        "id": self._generate_chunk_id(current_chunk, filename, loc),
-                        "text": current_chunk,
-                        "source": filename,
-                        "location": loc,
-                        "type": "private_docx"
-                    })
-                    current_chunk = ""
-                    start_idx = i + 1
-            if current_chunk:
-                chunks.append({
-                    "id": self._generate_chunk_id(current_chunk, filename, f"Para {start_idx}-End"),
-                    "text": current_chunk,
-                    "source": filename,
-                    "location": f"Para {start_idx}-End",
-                    "type": "private_docx"
-                })
+            paras = ((self._clean_text(p.text), i) for i, p in enumerate(doc.paragraphs))
+            for p in self.chunker.pack((t, i) for t, i in paras if t):
+                chunks.append(self._chunk(p.text, filename, self._span("Para", p.refs), "private_docx"))
         except Exception as e:
             print(f"❌ Error reading Word: {e}")
+            chunks = PartialRead(chunks)
+        return chunks
+
+    def _page_type(self, page_url):
+        path = page_url.lower().split("://", 1)[-1].partition("/")[2]
+        if "investor" in path or "financial" in path or "annual-report" in path: return "public_web_financial"
+        if "about" in path: return "public_web_about"
+        return None
+
+    def _html_chunks(self, page_url, content):
+        chunks = []
+        page_type = self._page_type(page_url)
+        sections, lines = extract_sections(content) # One parse; page chrome already dropped
+
+        if sections:
+            for title, text in sections:
+                section_title = self._clean_text(title)
+                clean_content = self._clean_text(text)
+                if len(clean_content) > 50:
+                    c_type = page_type or "public_web_general"
+                    if 'about' in section_title.lower(): c_type = "public_web_about"
+                    elif 'investor' in section_title.lower(): c_type = "public_web_financial"
+
+                    pieces = list(self.chunker.pack((s, 0) for s in sentences(clean_content)))
+                    for k, p in enumerate(pieces, start=1):
+                        part = f" (part {k}/{len(pieces)})" if len(pieces) > 1 else ""
+                        chunks.append(self._chunk(p.text, page_url, f"Section: {section_title[:50]}{part}", c_type))
+        else:
+            text = self._clean_text("\n".join(lines))
+            numbered = ((line, n) for n, line in enumerate(text.split("\n"), start=1) if line.strip())
+            for p in self.chunker.pack(numbered):
+                chunks.append(self._chunk(p.text, page_url, f"Main Page (lines {p.refs[0]}-{p.refs[-1]})",
+                                          page_type or "public_web_generic"))
         return chunks
 
     def _scrape_web(self, url):
         chunks = []
         try:
             print(f"🌐 Scraping: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15, verify=False)
-            if response.status_code != 200:
-                print(f"⚠️ Failed to scrape {url} ({response.status_code})")
-                return chunks
+            if self.crawl_pages <= 1:
+                response = self.fetcher.get(url)
+                if response.status_code != 200:
+                    print(f"⚠️ Failed to scrape {url} ({response.status_code})")
+                    return chunks
+                return self._html_chunks(url, response.content)
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            for tag in soup(["script", "style", "nav", "footer", "iframe"]):
-                tag.extract()
-
-            headers = soup.find_all(['h1', 'h2', 'h3'])
-            if headers:
-                for header in headers:
-                    section_title = self._clean_text(header.get_text())
-                    content = ""
-                    for sib in header.next_siblings:
-                        if sib.name in ['h1', 'h2', 'h3']: break
-                        if hasattr(sib, 'get_text'): content += sib.get_text(separator=" ", strip=True) + " "
-                    
-                    clean_content = self._clean_text(content)
-                    if len(clean_content) > 50:
-                        c_type = "public_web_general"
-                        if 'about' in section_title.lower(): c_type = "public_web_about"
-                        elif 'investor' in section_title.lower(): c_type = "public_web_financial"
-
-                        chunks.append({
-                            "id": self._generate_chunk_id(clean_content, url, section_title),
-                            "text": clean_content[:4000],
-                            "source": url,
-                            "location": f"Section: {section_title[:50]}",
-                            "type": c_type
-                        })
-            else:
-                text = self._clean_text(soup.get_text(separator="\n"))
-                chunks.append({
-                    "id": self._generate_chunk_id(text, url, "Main"),
-                    "text": text[:10000],
-                    "source": url,
-                    "location": "Main Page",
-                    "type": "public_web_generic"
-                })
+            crawler = SiteCrawler(self.fetcher, max_pages=self.crawl_pages, max_depth=self.crawl_depth,
+                                  deadline=self.crawl_seconds)
+            pages = crawler.crawl(url)
+            stats = next(iter(crawler.stats.values()), {})
+            if not pages:
+                print(f"⚠️ Failed to scrape {url} (no pages)")
+                return chunks
+            print(f"   🕸️ {len(pages)} pages from {stats.get('fetched', 0)} fetches in {stats.get('seconds', 0)}s"
+                  + (" (deadline hit)" if stats.get("timed_out") else ""))
+            for page_url, response in pages:
+                try: chunks.extend(self._html_chunks(page_url, response.content))
+                except Exception as e: print(f"⚠️ Skipped {page_url}: {e}")
         except Exception as e:
             print(f"❌ Scraping Error: {e}")
         return chunks
@@ -229,7 +400,16 @@ class UniversalLoader:
     def load_data(self, source):
         if source.startswith("http"): return self._scrape_web(source)
         if not os.path.exists(source): return []
-        
+        if not self.doc_cache: return self._parse_file(source)
+
+        cached = self.doc_cache.get(source)
+        if cached is not None: return cached
+        chunks = self._parse_file(source)
+        # Don't pin failed, partial or empty parses
+        if chunks and not isinstance(chunks, PartialRead): self.doc_cache.put(source, chunks)
+        return chunks
+
+    def _parse_file(self, source):
         ext = source.split('.')[-1].lower()
         if ext in ['xlsx', 'xls']: return self._read_excel(source)
         if ext == 'pdf': return self._read_pdf(source)
@@ -0,0 +1,123 @@
+import re
+import zlib
+import importlib.util
+from collections import defaultdict
+from tokens import estimate_tokens
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+_WORD = re.compile(r"\w+")
+_MERSENNE = (1 << 61) - 1
+
+def _priority(chunk):
+    """Lower sorts first: financial before narrative, private before public (or an inherited 'priority')."""
+    if 'priority' in chunk: return tuple(chunk['priority'])
+    t = chunk.get('type', '')
+    return (0 if 'financial' in t else 1, 0 if t.startswith('private') else 1)
+
+class NearDuplicateFilter:
+    """MinHash + LSH near-duplicate removal over a company's merged chunk list.
+
+    Chunks are shingled into word n-grams and sketched with `num_perm` MinHash
+    permutations; LSH banding proposes candidate pairs, which are confirmed on their
+    exact shingle overlap: copies when both chunks are covered, or containment of
+    the smaller chunk in the larger one (a scraped section repeated inside a
+    one-pager chunk). From each duplicate group the highest-priority copy survives
+    with its citation ID. A contained chunk always goes, since the bigger one holds
+    all its text; the bigger one inherits its priority if that was higher.
+    Without numpy only exact (normalised) duplicates are removed.
+    """
+    def __init__(self, threshold=0.8, num_perm=128, bands=32, shingle=5, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle = shingle
+        self.seed = seed
+        self._perms = None
+
+    def _shingles(self, text):
+        words = _WORD.findall(text.lower())
+        n = self.shingle
+        grams = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))} if words else set()
+        return {zlib.crc32(g.encode("utf-8")) for g in grams}
+
+    def _signatures(self, shingle_sets):
+        import numpy as np
+        if self._perms is None:
+            rng = np.random.default_rng(self.seed)
+            self._perms = (rng.integers(1, _MERSENNE, self.num_perm, dtype=np.uint64),
+                           rng.integers(0, _MERSENNE, self.num_perm, dtype=np.uint64))
+        a, b = self._perms
+        sigs = np.full((len(shingle_sets), self.num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for i, s in enumerate(shingle_sets):
+            if not s: continue
+            x = np.fromiter(s, dtype=np.uint64, count=len(s))[:, None]
+            sigs[i] = ((x * a + b) % _MERSENNE).min(axis=0) # uint64 wrap-around is part of the hash
+        return sigs
+
+    def _candidates(self, sigs):
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            for i, row in enumerate(sigs[:, band * rows:(band + 1) * rows]):
+                buckets[row.tobytes()].append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)): pairs.add((members[x], members[y]))
+        return pairs
+
+    def _groups(self, chunks):
+        """(i, j, contained) pairs judged duplicates; contained=True means i lives inside j."""
+        sets = [self._shingles(c.get('text', '')) for c in chunks]
+        if not HAS_NUMPY:
+            seen, dups = {}, []
+            for i, s in enumerate(sets):
+                key = frozenset(s)
+                if key in seen: dups.append((i, seen[key], False))
+                elif s: seen[key] = i
+            return dups
+        sigs = self._signatures(sets)
+        dups = []
+        for i, j in sorted(self._candidates(sigs)):
+            if not sets[i] or not sets[j]: continue
+            small, big = (i, j) if len(sets[i]) <= len(sets[j]) else (j, i)
+            # LSH only proposes the pair; the shingle sets are at hand, so overlap is counted exactly
+            inter = len(sets[small] & sets[big])
+            # Copies of each other only if the bigger one is covered too; otherwise it holds text the other lacks
+            if inter / len(sets[big]) >= self.threshold: dups.append((i, j, False))
+            elif inter / len(sets[small]) >= self.threshold: dups.append((small, big, True))
+        return dups
+
+    def filter(self, chunks):
+        """Returns (kept_chunks, report) with input order preserved."""
+        report = {"removed": 0, "bytes_removed": 0, "tokens_removed": 0}
+        if self.threshold <= 0 or len(chunks) < 2: return chunks, report
+        parent = list(range(len(chunks)))
+        def find(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+        contained = []
+        for i, j, inside in self._groups(chunks):
+            if inside: contained.append((i, j))
+            else: parent[find(i)] = find(j)
+        prio = [_priority(c) for c in chunks]
+        drop = set()
+        for small, big in contained:
+            drop.add(small)
+            if prio[small] < prio[big]: prio[big] = prio[small]
+        clusters = defaultdict(list)
+        for k in range(len(chunks)): clusters[find(k)].append(k)
+        for members in clusters.values():
+            if len(members) > 1:
+                best = min(members, key=lambda k: (k in drop, prio[k], k)) # A contained copy is already gone
+                drop.update(k for k in members if k != best)
+        for k in drop:
+            text = chunks[k].get('text', '')
+            report["bytes_removed"] += len(text.encode("utf-8"))
+            report["tokens_removed"] += estimate_tokens(text)
+        report["removed"] = len(drop)
+        return [c if prio[k] == _priority(c) else dict(c, priority=prio[k])
+                for k, c in enumerate(chunks) if k not in drop], report
@@ -0,0 +1,70 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+class ChunkCache:
+    """Persistent parsed-chunk cache for local source files (SQLite, zlib-compressed JSON blobs).
+
+    An entry is reused when path, size and mtime match (no read of the file at all);
+    if only the mtime moved, the content hash decides. `version` invalidates every
+    entry when the reader code changes.
+    """
+    def __init__(self, db_path=".cache/chunks.sqlite", version="1"):
+        self.db_path = db_path
+        self.version = str(version)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path): os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT,
+            version TEXT, chunks BLOB, updated REAL)""")
+        self.conn.commit()
+
+    def _hash_file(self, path):
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''): h.update(block)
+        return h.hexdigest()
+
+    def _decode(self, blob):
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, sha256, version, chunks FROM files WHERE path=?",
+                                    (path,)).fetchone()
+        if row and row[3] == self.version and row[0] == st.st_size:
+            if row[1] == st.st_mtime_ns:
+                with self._lock: self.hits += 1
+                return self._decode(row[4])
+            # Touched but maybe unchanged (git checkout, copy): fall back to the content hash
+            if self._hash_file(path) == row[2]:
+                with self._lock:
+                    self.conn.execute("UPDATE files SET mtime_ns=? WHERE path=?", (st.st_mtime_ns, path))
+                    self.conn.commit()
+                    self.hits += 1
+                return self._decode(row[4])
+        with self._lock: self.misses += 1
+        return None
+
+    def put(self, path, chunks):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        blob = zlib.compress(json.dumps(chunks, ensure_ascii=False).encode('utf-8'), 6)
+        digest = self._hash_file(path)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?)",
+                              (path, st.st_size, st.st_mtime_ns, digest, self.version, blob, time.time()))
+            self.conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
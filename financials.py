@@ -0,0 +1,278 @@
+import re
+import datetime
+import importlib.util
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+_YEAR_CELL = re.compile(r"^(?:fy|cy|mar|march|dec)?[\s\-'’]*(\d{4}|\d{2})(?:\s*[-/]\s*(\d{2,4}))?\s*[ae]?$", re.IGNORECASE)
+_NUM = r"\(?-?[\d,]*\.?\d+\)?"
+_KV = re.compile(rf"(\d{{4}})\s*:\s*({_NUM}|None|N/?A|-(?!\d))", re.IGNORECASE) # "2014: -42.8" / "2015: None"
+_PDF_ROW = re.compile(rf"^(.*?[A-Za-z].*?)\s+((?:{_NUM}\s+)*{_NUM})$")
+_SEP_ROW = re.compile(r"^\|?\s*:?-{3,}")
+# Multipliers into INR crore
+UNITS = {"cr": 1.0, "crore": 1.0, "crores": 1.0, "mn": 0.1, "million": 0.1, "lakh": 0.01, "lakhs": 0.01,
+         "lac": 0.01, "lacs": 0.01, "bn": 100.0, "billion": 100.0}
+_UNIT_WORD = r"(crores?|cr|mn|million|lakhs?|lacs?|bn|billion)\b"
+_UNIT = re.compile(rf"(?:₹|rs\.?|inr)\s*(?:in\s+)?{_UNIT_WORD}|\bin\s+(?:₹|rs\.?|inr)?\s*{_UNIT_WORD}|\(\s*{_UNIT_WORD}\s*\)",
+                   re.IGNORECASE)
+# Canonical line items: whole-label patterns (trailing "(...)" removed), best label first
+METRICS = {
+    "revenue": (r"(?:total\s+)?revenue from operations", r"(?:total\s+|net\s+)?revenue", r"net sales",
+                r"total income from operations", r"sales", r"turnover"),
+    "ebitda": (r"(?:operating\s+|adjusted\s+|reported\s+)?ebitda",),
+    "ebit": (r"ebit",),
+    "pat": (r"pat", r"profit after tax", r"net profit", r"profit for the (?:year|period)"),
+    "borrowings": (r"(?:total\s+)?borrowings", r"total debt"),
+    "cfo": (r"net cash (?:flow )?(?:from|generated from) operating activities",),
+}
+LABELS = {"revenue": "Revenue", "ebitda": "EBITDA", "ebit": "EBIT", "pat": "PAT", "borrowings": "Borrowings",
+          "cfo": "Operating cash flow"}
+
+def year_of(cell):
+    """'2024', 'FY24', 'FY 2023-24', 'Mar-24', 2024, datetime -> 2024; anything else -> None."""
+    if isinstance(cell, (datetime.date, datetime.datetime)): return cell.year
+    if isinstance(cell, (int, float)) and not isinstance(cell, bool):
+        return int(cell) if float(cell).is_integer() and 1990 <= cell <= 2100 else None
+    m = _YEAR_CELL.match(str(cell or "").strip())
+    if not m: return None
+    y = m.group(2) or m.group(1)
+    y = int(y) + 2000 if len(y) == 2 else int(y)
+    return y if 1990 <= y <= 2100 else None
+
+def to_number(cell):
+    """'1,234.5' / '(12.0)' / '₹ 40' / 7 -> float; blanks, 'None', 'N/A' -> None."""
+    if isinstance(cell, bool): return None
+    if isinstance(cell, (int, float)): return float(cell)
+    t = str(cell or "").strip().replace(',', '').replace('₹', '').replace('%', '')
+    neg = t.startswith('(') and t.endswith(')')
+    try: v = float(t.strip('()'))
+    except ValueError: return None
+    return -v if neg else v
+
+def _header_year(cell):
+    """year_of for header cells; a bare "15" in a data row is a number, not FY15."""
+    cell = str(cell or "").strip()
+    return None if re.fullmatch(r"\d{1,2}(?:\.\d+)?", cell) else year_of(cell)
+
+def unit_of(text):
+    """Multiplier into crore for the first unit declaration in `text` ("₹ in Cr", "(INR Mn)", "in lakhs"), or None."""
+    m = _UNIT.search(text or "")
+    if not m: return None
+    return UNITS.get(next(g for g in m.groups() if g).lower())
+
+class FinancialExtractor:
+    """Deterministic financial pre-extraction from a company's chunks (NumPy, no LLM).
+
+    Reads year series from every format the loader produces: "- Item | 2014: x |
+    2015: y" statement lines, markdown pipe tables with a year header row, Excel
+    chunks' typed `table`, and PDF statement lines under a year header line. Values
+    are normalised to INR crore (Cr / Mn / Lakh / Bn declared in the chunk or the
+    row label). `default_unit` is assumed only for the one-pager statement lines;
+    other sources with no declared unit pass through unscaled and are listed in
+    `unit_unknown`, so they never reach the deck as crore. Growth, margins and CAGR are computed
+    over the last `years` years in one vectorised pass. Chunks that are mostly
+    statement rows are reported as `consumed`, so the prompt can carry the
+    compact summary instead of the tables. Without numpy nothing is extracted.
+    """
+    def __init__(self, default_unit="Mn", years=5):
+        self.default_scale = UNITS[default_unit.lower()]
+        self.years = years
+        self._metrics = {k: [re.compile(rf"^(?:{p})$", re.IGNORECASE) for p in pats] for k, pats in METRICS.items()}
+
+    def _label(self, raw):
+        label = raw.strip().lstrip("-*• ").strip().strip("|").strip()
+        return re.sub(r"\s*\([^)]*\)\s*$", "", label).strip(), label
+
+    def _match(self, label):
+        """(metric, rank) for a row label, rank 0 being the metric's preferred label; (None, None) otherwise."""
+        for key, patterns in self._metrics.items():
+            for rank, rx in enumerate(patterns):
+                if rx.match(label): return key, rank
+        return None, None
+
+    def _rows(self, chunk):
+        """(label, {year: value}, unit_known) rows found in one chunk, plus how many of its lines they used.
+
+        Values are in Cr when the unit is known, else as written.
+        """
+        text = chunk.get('text', '')
+        scale = unit_of(text[:400])
+        rows, used = [], 0
+        def row(label, raw, vals):
+            s = unit_of(raw) or scale
+            rows.append((label, {y: v * (s or 1.0) for y, v in vals if v is not None}, s is not None))
+        table = chunk.get('table')
+        if table and table.get('years'):
+            for label, vals in table.get('line_items', {}).items(): row(label, label, zip(table['years'], vals))
+            return rows, len(text.split("\n"))
+
+        header_years = None
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line: continue
+            kv = _KV.findall(line)
+            if len(kv) >= 2:
+                label, raw = self._label(line.split("|", 1)[0])
+                s = unit_of(raw) or scale or self.default_scale # The one-pager format's house unit
+                rows.append((label, {int(y): to_number(v) * s for y, v in kv if to_number(v) is not None}, True))
+                used += 1
+                continue
+            if line.startswith("|"):
+                if _SEP_ROW.match(line):
+                    used += 1
+                    continue
+                cells = [c.strip() for c in line.strip("|").split("|")]
+                years = [_header_year(c) for c in cells[1:]]
+                if sum(1 for y in years if y) >= max(2, len(years) / 2):
+                    header_years = years
+                    used += 1
+                elif header_years and len(cells) - 1 == len(header_years):
+                    label, raw = self._label(cells[0])
+                    row(label, raw, ((y, to_number(c)) for y, c in zip(header_years, cells[1:]) if y))
+                    used += 1
+                continue
+            # PDF statements: a line of years, then "Label 1,234.5 1,456.7 ..." rows
+            tokens = line.replace("|", " ").split()
+            if len(tokens) >= 2 and all(_header_year(t) for t in tokens[-2:]):
+                header_years = [y for y in (_header_year(t) for t in tokens) if y]
+                used += 1
+                continue
+            m = _PDF_ROW.match(line)
+            if header_years and m:
+                nums = m.group(2).split()
+                if len(nums) == len(header_years):
+                    label, raw = self._label(m.group(1))
+                    row(label, raw, ((y, to_number(v)) for y, v in zip(header_years, nums)))
+                    used += 1
+        return rows, used
+
+    def extract(self, chunks):
+        """{unit, unit_unknown, years, metrics, yoy, margins, cagr, sources, consumed} or None when no revenue
+        series is found."""
+        if not HAS_NUMPY: return None
+        import numpy as np
+        found, consumed = {}, set() # key -> [(unit unknown, rank, series, chunk id)]
+        for c in chunks:
+            rows, used = self._rows(c)
+            if not rows: continue
+            lines = sum(1 for l in c.get('text', '').split("\n") if l.strip())
+            # A table in an unknown unit stays in the prompt as written
+            if (c.get('table') or used * 2 >= lines) and all(known for _, _, known in rows): consumed.add(c['id'])
+            for label, series, known in rows:
+                key, rank = self._match(label)
+                if key and series: found.setdefault(key, []).append((not known, rank, series, c['id']))
+        # A stated unit wins, then the preferred label, then the fullest series; chunks repeating it (a ratios
+        # block) are extra sources
+        picked = {k: min(cands, key=lambda c: (c[0], c[1], -len(c[2]))) for k, cands in found.items()}
+        best = {k: p[2] for k, p in picked.items()}
+        unknown = [k for k, p in picked.items() if p[0]]
+        sources = {k: [cid for _, _, s, cid in cands if s.items() <= best[k].items()] for k, cands in found.items()}
+        if not best.get("revenue"): return None
+
+        keys = list(best)
+        end = max(best["revenue"]) # Window ends at the latest reported revenue; gaps stay visible as "-"
+        years = list(range(end - self.years + 1, end + 1))
+        while not any(years[0] in best[k] for k in keys): years.pop(0)
+        m = np.full((len(keys), len(years)), np.nan)
+        for i, k in enumerate(keys):
+            for j, y in enumerate(years):
+                if y in best[k]: m[i, j] = best[k][y]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            prev = np.concatenate([np.full((len(keys), 1), np.nan), m[:, :-1]], axis=1)
+            yoy = np.where(np.abs(prev) > 0, (m - prev) / np.abs(prev) * 100, np.nan)
+            rev = m[keys.index("revenue")]
+            # Only between figures in the same known unit
+            margins = {f"{k}_margin": np.where(rev > 0, m[keys.index(k)] / rev * 100, np.nan)
+                       for k in ("ebitda", "pat") if k in keys and k not in unknown and "revenue" not in unknown}
+            # CAGR between each row's first and last reported value, over the actual year gap; only
+            # defined when both ends are positive (a loss at either end has no meaningful CAGR)
+            valid = np.isfinite(m)
+            first = np.argmax(valid, axis=1)
+            last = m.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+            yr = np.array(years, dtype=float)
+            span = yr[last] - yr[first]
+            rows_idx = np.arange(len(keys))
+            start, stop = m[rows_idx, first], m[rows_idx, last]
+            ok = valid.any(axis=1) & (span > 0) & (start > 0) & (stop > 0)
+            cagr = np.where(ok, (np.power(stop / start, 1 / np.where(span > 0, span, 1)) - 1) * 100, np.nan)
+
+        def clean(a): return [None if not np.isfinite(v) else round(float(v), 2) for v in a]
+        return {
+            "unit": "INR Cr", "unit_unknown": unknown, "years": years,
+            "metrics": {k: clean(m[i]) for i, k in enumerate(keys)},
+            "yoy": {k: clean(yoy[i]) for i, k in enumerate(keys)},
+            "margins": {k: clean(v) for k, v in margins.items()},
+            "cagr": {k: (round(float(cagr[i]), 2), years[first[i]], years[last[i]])
+                     for i, k in enumerate(keys) if np.isfinite(cagr[i])},
+            "sources": {k: list(dict.fromkeys(v))[:3] for k, v in sources.items()},
+            "consumed": sorted(consumed),
+        }
+
+    def _fmt(self, v):
+        if v is None: return "-"
+        return f"{v:,.0f}" if abs(v) >= 100 else f"{v:,.1f}"
+
+    def summary(self, fin):
+        """Compact prompt block replacing the consumed statement tables."""
+        years = fin["years"]
+        out = [f"COMPUTED FINANCIALS ({fin['unit']}, deterministic; slide_2 figures are filled from these):",
+               "Metric | " + " | ".join(f"FY{y % 100:02d}" for y in years) + " | Source"]
+        for k, vals in fin["metrics"].items():
+            src = " ".join(f"[{i}]" for i in fin["sources"].get(k, [])[:1])
+            label = LABELS[k] + (" (unit not stated)" if k in fin["unit_unknown"] else "")
+            out.append(f"{label} | " + " | ".join(self._fmt(v) for v in vals) + f" | {src}")
+            if k in ("revenue", "ebitda", "pat"):
+                out.append(f"{LABELS[k]} YoY % | " + " | ".join(self._fmt(v) for v in fin["yoy"][k]))
+        for k, vals in fin["margins"].items():
+            out.append(f"{LABELS[k.split('_')[0]]} margin % | " + " | ".join(self._fmt(v) for v in vals))
+        for k, (pct, y0, y1) in fin["cagr"].items():
+            if k in ("revenue", "ebitda", "pat"): out.append(f"{LABELS[k]} CAGR FY{y0 % 100:02d}-FY{y1 % 100:02d}: {pct:.1f}%")
+        return "\n".join(out) + "\n\n"
+
+    def _latest(self, fin, key):
+        """(index, value) of the latest figure in Cr; (None, None) when missing or its unit is unknown."""
+        vals = [] if key in fin["unit_unknown"] else fin["metrics"].get(key) or []
+        for j in range(len(vals) - 1, -1, -1):
+            if vals[j] is not None: return j, vals[j]
+        return None, None
+
+    def slide_2(self, fin):
+        """Deterministic slide_2 metrics + chart_data (revenue bars and CAGR) in deck units."""
+        metrics, years = {}, fin["years"]
+        j, rev = self._latest(fin, "revenue")
+        if rev is not None: metrics[f"Revenue (FY{years[j] % 100:02d})"] = f"{self._fmt(rev)} Cr"
+        j, ebitda = self._latest(fin, "ebitda")
+        if ebitda is not None:
+            margin = fin["margins"].get("ebitda_margin", [None] * len(years))[j]
+            metrics[f"EBITDA (FY{years[j] % 100:02d})"] = f"{self._fmt(ebitda)} Cr" + (
+                f" ({margin:.1f}% margin)" if margin is not None else "")
+        if "revenue" in fin["cagr"]:
+            pct, y0, y1 = fin["cagr"]["revenue"]
+            metrics[f"Revenue CAGR (FY{y0 % 100:02d}-{y1 % 100:02d})"] = f"{pct:.1f}%"
+        j, pat = self._latest(fin, "pat")
+        if pat is not None: metrics[f"PAT (FY{years[j] % 100:02d})"] = f"{self._fmt(pat)} Cr"
+
+        revenue = [] if "revenue" in fin["unit_unknown"] else fin["metrics"]["revenue"]
+        points = [(str(y), v) for y, v in zip(years, revenue) if v is not None]
+        chart = {"years": [y for y, _ in points], "revenue_values": [round(v, 1) for _, v in points],
+                 "data_quality": "Actuals (computed)"}
+        if "revenue" in fin["cagr"]: chart["cagr_pct"] = fin["cagr"]["revenue"][0]
+        return {"metrics": metrics, "chart_data": chart}
+
+    def apply(self, data, fin):
+        """Overwrites the model's slide_2 figures with the computed ones; other metrics it found are kept."""
+        if not fin or not isinstance(data, dict): return data
+        computed = self.slide_2(fin)
+        s2 = data.get("slide_2") if isinstance(data.get("slide_2"), dict) else {}
+        theirs = s2.get("metrics") if isinstance(s2.get("metrics"), dict) else {}
+        # The model's own cards are replaced only where a figure was computed (not for an unknown unit)
+        words = {"revenue": ("revenue",), "ebitda": ("ebitda",), "pat": ("pat", "profit")}
+        covered = [w for k, ws in words.items() if self._latest(fin, k)[1] is not None for w in ws]
+        if "revenue" in fin["cagr"]: covered.append("cagr") # Unit-free
+        extra = {k: v for k, v in theirs.items() if not any(w in k.lower() for w in covered)}
+        head = dict(list(computed["metrics"].items())[:3])
+        metrics = {**head, **extra, **computed["metrics"]} # Revenue, EBITDA, CAGR lead the cards; PAT after extras
+        chart = computed["chart_data"] if len(computed["chart_data"]["years"]) >= 2 else s2.get("chart_data", {})
+        data["slide_2"] = {**s2, "metrics": metrics, "chart_data": chart}
+        return data
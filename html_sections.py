@@ -0,0 +1,137 @@
+import re
+import importlib.util
+from html.parser import HTMLParser
+
+HAS_LXML = importlib.util.find_spec("lxml") is not None
+
+HEADERS = {"h1", "h2", "h3"}
+# Whole subtrees dropped as page chrome
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "footer", "aside", "iframe", "form",
+             "button", "select"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "header", "li", "ul", "ol", "dl", "dt", "dd", "tr",
+              "table", "blockquote", "pre", "h4", "h5", "h6", "figcaption", "address"} | HEADERS
+VOID_TAGS = {"br", "img", "hr", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+_BOILERPLATE = re.compile(r"(?:^|[\s_-])(?:cookies?|consent|gdpr|breadcrumbs?|navbar|menu|sidebar|newsletter|popup|"
+                          r"modal|skip-link|sr-only|visually-hidden)(?:$|[\s_-])"
+                          # Share widgets only by whole class name: "share-price", "social-responsibility" are content
+                          r"|(?:^|\s)(?:share|social|(?:social[_-])?share[_-](?:buttons?|links?|icons?|bar|tools)|"
+                          r"social[_-](?:share|links?|icons?|media|buttons?))(?:$|\s)", re.IGNORECASE)
+_SKIP_ROLES = {"navigation", "contentinfo", "search", "dialog", "complementary"}
+
+class SectionCollector:
+    """Parser target that splits a page into h1/h2/h3 sections in one pass.
+
+    Works as an lxml parser target (start/end/data/close) and is driven by the
+    stdlib HTMLParser fallback the same way. Text after a header belongs to it
+    until the next h1-h3 anywhere in the document, so nesting depth doesn't
+    matter. Boilerplate subtrees (script/style, nav/footer/aside, forms, cookie
+    banners, menus and other chrome by class/id/role, hidden elements) are
+    skipped. close() returns (sections, lines): [(title, text)] and the
+    page's text lines for pages without headers.
+    """
+    def __init__(self):
+        self.stack = [] # [(tag, opened_skip)]
+        self.skipping = False
+        self.title_tag = None
+        self.title, self.parts = None, [] # Open section
+        self.title_parts = []
+        self.sections = []
+        self.lines, self.line = [], []
+
+    def _is_boilerplate(self, tag, attrs):
+        if tag in SKIP_TAGS: return True
+        if "hidden" in attrs or attrs.get("aria-hidden") == "true" or attrs.get("role") in _SKIP_ROLES: return True
+        if "display:none" in (attrs.get("style") or "").replace(" ", ""): return True
+        marker = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        return bool(marker.strip()) and _BOILERPLATE.search(marker) is not None
+
+    def _break(self):
+        if self.line:
+            self.lines.append(" ".join(self.line))
+            self.line = []
+
+    def _flush_section(self):
+        if self.title is not None: self.sections.append((self.title, " ".join(self.parts)))
+        self.title, self.parts = None, []
+
+    def start(self, tag, attrs):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in VOID_TAGS:
+            if tag == "br" and not self.skipping: self._break()
+            return
+        opened = not self.skipping and self._is_boilerplate(tag, attrs)
+        self.stack.append((tag, opened))
+        if opened: self.skipping = True
+        if self.skipping: return
+        if tag in BLOCK_TAGS: self._break()
+        if tag in HEADERS and self.title_tag is None:
+            self._flush_section()
+            self.title_tag, self.title_parts = tag, []
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        # Unclosed children (<p>, <li> ...) close with their parent; stray end tags are ignored
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag: break
+        else:
+            return
+        while len(self.stack) > i:
+            name, opened = self.stack.pop()
+            if opened:
+                self.skipping = False
+                continue
+            if self.skipping: continue
+            if name in BLOCK_TAGS: self._break()
+            if name == self.title_tag:
+                self.title = " ".join(self.title_parts).strip()
+                self.title_tag = None
+
+    def data(self, text):
+        if self.skipping or not text.strip(): return
+        text = text.strip()
+        self.line.append(text)
+        if self.title_tag: self.title_parts.append(text)
+        elif self.title is not None: self.parts.append(text)
+
+    def close(self):
+        if self.title_tag: self.title = " ".join(self.title_parts).strip()
+        self._flush_section()
+        self._break()
+        return self.sections, self.lines
+
+class _StdlibDriver(HTMLParser):
+    """Feeds HTMLParser events into a SectionCollector (used when lxml isn't installed)."""
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {k: v or "" for k, v in attrs})
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+def _decode(content):
+    if isinstance(content, str): return content
+    try: return content.decode("utf-8")
+    except UnicodeDecodeError: return content.decode("cp1252", "replace")
+
+def extract_sections(content, backend=None):
+    """(sections, lines) for an HTML page (bytes or str); backend is "lxml", "stdlib" or None for the fastest."""
+    backend = backend or ("lxml" if HAS_LXML else "stdlib")
+    collector = SectionCollector()
+    if backend == "lxml":
+        from lxml import etree
+        # libxml2 sniffs <meta charset>; without one, UTF-8 is the sane default for the web
+        sniff = isinstance(content, str) or b"charset" in content[:2048].lower()
+        parser = etree.HTMLParser(target=collector, remove_comments=True, remove_pis=True,
+                                  encoding=None if sniff else "utf-8")
+        parser.feed(content)
+        return parser.close()
+    driver = _StdlibDriver(collector)
+    driver.feed(_decode(content))
+    driver.close()
+    return collector.close()
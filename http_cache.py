@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+class FetchResult:
+    def __init__(self, url, status_code, content, headers, from_cache=False, revalidated=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+
+class HttpCache:
+    """On-disk store of GET responses with their ETag/Last-Modified validators."""
+    def __init__(self, cache_dir=".cache/http", ttl=6 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _base(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def load(self, url):
+        base = self._base(url)
+        try:
+            with open(base + ".json", 'r', encoding='utf-8') as f: meta = json.load(f)
+            with open(base + ".body", 'rb') as f: body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get("fetched", 0) < self.ttl
+
+    def store(self, url, headers, body):
+        base = self._base(url)
+        meta = {"url": url, "fetched": time.time(),
+                "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                "content_type": headers.get("Content-Type")}
+        suffix = f".{threading.get_ident()}.tmp"
+        with open(base + ".body" + suffix, 'wb') as f: f.write(body)
+        os.replace(base + ".body" + suffix, base + ".body")
+        with open(base + ".json" + suffix, 'w', encoding='utf-8') as f: json.dump(meta, f)
+        os.replace(base + ".json" + suffix, base + ".json")
+
+    def touch(self, url, meta):
+        meta["fetched"] = time.time()
+        base = self._base(url)
+        with open(base + ".json", 'w', encoding='utf-8') as f: json.dump(meta, f)
+
+class CachedFetcher:
+    """Pooled `requests.Session` in front of an HttpCache.
+
+    Fresh entries (younger than the TTL) are served without touching the network;
+    stale ones are revalidated with If-None-Match / If-Modified-Since and a 304
+    reuses the stored body. A stale copy is also served if the refetch fails or
+    the server answers with a 5xx.
+    """
+    def __init__(self, cache=None, headers=None, timeout=15, verify=False, pool_size=16, session=None):
+        self.cache = cache
+        self.timeout = timeout
+        self.verify = verify
+        self._session = session
+        if session is not None and headers: session.headers.update(headers)
+        self.pool_size = pool_size
+        self.default_headers = headers or {}
+        self.stats = {"fresh": 0, "revalidated": 0, "downloaded": 0, "stale": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # requests is only imported once something is actually fetched
+        if self._session is None:
+            with self._lock:
+                if self._session is None: self._session = self._build_session(self.pool_size)
+        return self._session
+
+    def _build_session(self, pool_size):
+        import requests
+        import urllib3
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning) # verify=False by default
+        s = requests.Session()
+        s.headers.update(self.default_headers)
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        return s
+
+    def _count(self, key):
+        with self._lock: self.stats[key] += 1
+
+    def get(self, url):
+        entry = self.cache.load(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry[0]):
+            self._count("fresh")
+            return FetchResult(url, 200, entry[1], {"Content-Type": entry[0].get("content_type")}, from_cache=True)
+
+        cond = {}
+        if entry:
+            if entry[0].get("etag"): cond["If-None-Match"] = entry[0]["etag"]
+            if entry[0].get("last_modified"): cond["If-Modified-Since"] = entry[0]["last_modified"]
+        session = self.session
+        import requests
+        try:
+            r = session.get(url, headers=cond, timeout=self.timeout, verify=self.verify)
+        except requests.RequestException:
+            if not entry: raise
+            r = None
+        if entry and (r is None or r.status_code >= 500):
+            self._count("stale")
+            return FetchResult(url, 200, entry[1], {"Content-Type": entry[0].get("content_type")}, from_cache=True)
+
+        if r.status_code == 304 and entry:
+            self.cache.touch(url, entry[0])
+            self._count("revalidated")
+            return FetchResult(url, 200, entry[1], {"Content-Type": entry[0].get("content_type")},
+                               from_cache=True, revalidated=True)
+
+        self._count("downloaded")
+        if r.status_code == 200 and self.cache and "no-store" not in r.headers.get("Cache-Control", ""):
+            self.cache.store(url, r.headers, r.content)
+        return FetchResult(url, r.status_code, r.content, r.headers)
@@ -1,24 +1,107 @@
+import os
 import json
+import math
 import time
-from google import genai
-from google.genai import types
+import hashlib
+import threading
 from schema_guard import SectorGuard
+from llm_cache import CacheMiss
+from context_builder import ContextBuilder
+from model_probe import ModelProbe
+from keyword_matcher import SectorScorer
+from redaction import Redactor
+from financials import FinancialExtractor
+from tokens import estimate_tokens
+from json_stream import JsonFieldScanner, StreamAborted
+from types import SimpleNamespace
+
+def _percentile(values, pct):
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)) # Nearest-rank
+    return ordered[rank]
 
 class CostTracker:
-    def __init__(self):
+    def __init__(self, log_path="logs/llm_calls.jsonl"):
         self.total_cost_inr = 0
         self.session_cost = 0 
-    def log(self, input_tokens, output_tokens):
+        self.company_costs = {} # Per-company buckets, safe under the batch pipeline's threads
+        self.calls = []
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        if log_path and os.path.dirname(log_path): os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    def log(self, input_tokens, output_tokens, company=None):
         cost_usd = (input_tokens / 1e6 * 0.05) + (output_tokens / 1e6 * 0.20)
-        self.total_cost_inr += (cost_usd * 84.0)
-        self.session_cost += (cost_usd * 84.0)
+        with self._lock:
+            self.total_cost_inr += (cost_usd * 84.0)
+            self.session_cost += (cost_usd * 84.0)
+            if company: self.company_costs[company] = self.company_costs.get(company, 0) + (cost_usd * 84.0)
+        return cost_usd * 84.0
+    def company_cost(self, company):
+        with self._lock: return self.company_costs.get(company, 0)
+
+    def record(self, model, latency, attempt, outcome, usage=None, company=None, cached=False, **extra):
+        """One generate_content call: usage metadata, wall-clock latency, attempt and guard outcome."""
+        in_tok = (getattr(usage, 'prompt_token_count', None) or 0) if usage else 0
+        out_tok = (getattr(usage, 'candidates_token_count', None) or 0) if usage else 0
+        cost = 0 if cached else self.log(in_tok, out_tok, company)
+        rec = {"ts": time.time(), "company": company, "model": model, "attempt": attempt, "outcome": outcome,
+               "latency_s": round(latency, 3), "input_tokens": in_tok, "output_tokens": out_tok,
+               "cached_tokens": (getattr(usage, 'cached_content_token_count', None) or 0) if usage else 0,
+               "cache_hit": cached, "cost_inr": round(cost, 4), **extra}
+        with self._lock:
+            self.calls.append(rec)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f: f.write(json.dumps(rec) + "\n")
+        return rec
+
+    def summary(self):
+        by_model = {}
+        for r in self.calls: by_model.setdefault(r["model"], []).append(r)
+        out = {}
+        for model, recs in by_model.items():
+            live = [r for r in recs if not r["cache_hit"]]
+            lat = [r["latency_s"] for r in live]
+            outcomes = {}
+            for r in recs: outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+            out[model] = {
+                "calls": len(recs), "cache_hits": len(recs) - len(live),
+                "retries": len([r for r in recs if r["attempt"] > 1]),
+                "repairs": len([r for r in recs if r.get("kind") == "repair"]),
+                "input_tokens": sum(r["input_tokens"] for r in recs),
+                "output_tokens": sum(r["output_tokens"] for r in recs),
+                "latency_p50": _percentile(lat, 50), "latency_p90": _percentile(lat, 90),
+                "latency_p99": _percentile(lat, 99),
+                "ttff_p50": _percentile([r["ttff_s"] for r in live if r.get("ttff_s") is not None], 50),
+                "cost_inr": sum(r["cost_inr"] for r in recs), "outcomes": outcomes,
+            }
+        return out
+
+    def print_summary(self):
+        print("LLM CALLS:")
+        for model, s in self.summary().items():
+            print(f"  {model}: {s['calls']} calls ({s['cache_hits']} cached, {s['retries']} retries, {s['repairs']} repairs) | "
+                  f"tokens in {s['input_tokens']:,} / out {s['output_tokens']:,} | "
+                  f"latency p50 {s['latency_p50']:.1f}s p90 {s['latency_p90']:.1f}s p99 {s['latency_p99']:.1f}s "
+                  f"(first field p50 {s['ttff_p50']:.1f}s) | "
+                  f"₹{s['cost_inr']:.2f} | {s['outcomes']}")
 
 class AnalysisAgent:
-    def __init__(self, api_key):
-        self.client = genai.Client(api_key=api_key)
+    def __init__(self, api_key, cache=None, token_budget=24000, telemetry_log="logs/llm_calls.jsonl",
+                 probe_cache=".cache/model_probe.json", stream=True):
+        self._api_key = api_key
+        self._client = None # google-genai is heavy; built on first use
+        self.cache = cache # Optional llm_cache.ResponseCache
+        self.context_builder = ContextBuilder(token_budget=token_budget)
         self.guard = SectorGuard()
-        self.cost_tracker = CostTracker()
+        self.cost_tracker = CostTracker(telemetry_log)
         self.active_model = None 
+        self.stream = stream # Stream full generations so unusable answers are cancelled early
+        self.probe = ModelProbe(probe_cache) if probe_cache else None
+        self._negotiate_lock = threading.Lock()
+        self.redaction_stats = {"input_hits": 0, "output_hits": 0, "retries_avoided": 0}
+        self._stats_lock = threading.Lock()
+        self._vault_handles = {} # (model, context sha256) -> Gemini cached-content name ("" = unsupported)
         self.PRIORITY_MODELS = ["gemini-2.0-flash-lite", "gemini-1.5-flash", "gemini-2.5-flash-lite"]
         self.SECTOR_DEFINITIONS = {
             "Pharma": [("pharmaceutical", 10), ("api", 10), ("drug", 10)],
@@ -28,21 +111,47 @@ class AnalysisAgent:
             "Consumer Goods": [("fmcg", 10)],
             "D2C": [("ecommerce", 10)]
         }
+        self.sector_scorer = SectorScorer(self.SECTOR_DEFINITIONS)
+        self.financials = FinancialExtractor()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self._api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
 
     def test_api_connection(self):
+        """Picks the active model without spending a generate call.
+
+        Order: replay cache (offline) -> fastest healthy model from the probe cache
+        (`python list_models.py --probe`) -> first PRIORITY_MODELS entry the API lists.
+        """
         print("🔌 Negotiating Gemini...", end=" ")
+        if self.cache and self.cache.mode == "replay":
+            self.active_model = self.cache.last_model() or self.PRIORITY_MODELS[0]
+            print(f"✅ {self.active_model} (replay, offline)")
+            return True
+
+        probed = self.probe.best() if self.probe else None
+        if probed:
+            self.active_model = probed
+            print(f"✅ {self.active_model} (probe cache)")
+            return True
+
         try:
             remotes = [m.name.replace("models/", "") for m in self.client.models.list()]
         except: remotes = []
         for c in self.PRIORITY_MODELS:
             matches = [m for m in remotes if c in m]
             if matches:
-                try:
-                    self.client.models.generate_content(model=matches[0], contents="Test")
-                    self.active_model = matches[0]
-                    print(f"✅ {self.active_model}")
-                    return True
-                except: continue
+                self.active_model = matches[0]
+                print(f"✅ {self.active_model}")
+                return True
         
         fallback = "gemini-1.5-flash"
         self.active_model = fallback
@@ -50,48 +159,177 @@ class AnalysisAgent:
         return True
 
     def _format_context_with_ids(self, chunks):
-        MAX_CHARS = 1000000 
-        context_str = "DATA VAULT (Cite these IDs):\n"
-        sorted_chunks = sorted(chunks, key=lambda c: 3 if 'financial' in c['type'] else 1, reverse=True)
-        for c in sorted_chunks:
-            entry = f"[{c['id']}] SOURCE: {c['source']} ({c['location']})\n{c['text'][:40000]}\n\n"
-            if len(context_str) + len(entry) > MAX_CHARS: break
-            context_str += entry
-        return context_str, set()
-
-    def _sanitize(self, data, forbidden):
-        if isinstance(data, dict): return {k: self._sanitize(v, forbidden) for k,v in data.items()}
-        if isinstance(data, list): return [self._sanitize(i, forbidden) for i in data]
-        if isinstance(data, str):
-            clean = data.replace(forbidden, "Project X").replace(forbidden.replace(" ", ""), "Project X")
-            if "source_display" in data and ("." in data or forbidden.lower() in data.lower()): return "Internal Doc"
-            return clean
-        return data
-
-    def analyze_company(self, chunks, company_real_name):
-        if not self.active_model: self.test_api_connection()
+        context_str, ids, rep = self.context_builder.build(chunks)
+        pct = (100 * rep['tokens_saved'] / rep['naive_tokens']) if rep['naive_tokens'] else 0
+        print(f"✂️ Context: {rep['chunks_used']}/{rep['chunks_total']} chunks, ~{rep['tokens_used']:,} tokens "
+              f"(saved ~{rep['tokens_saved']:,} vs full dump, {pct:.0f}%)")
+        return context_str, ids
+
+    def detect_sector(self, chunks):
+        """(sector, scores) over every chunk, one matcher pass per chunk."""
+        return self.sector_scorer.classify(chunks)
+
+    def _sanitize(self, data, redactor):
+        """Masks the output with the company's redactor; returns (data, hits)."""
+        data, hits = redactor.redact_obj(data)
+        for c in data.get('citations', []) if isinstance(data, dict) else []:
+            # Filenames and URLs must never reach the deck
+            if isinstance(c, dict) and "." in str(c.get('source_display', '')): c['source_display'] = "Internal Doc"
+        return data, hits
+
+    def _count_redaction(self, key, n=1):
+        with self._stats_lock: self.redaction_stats[key] += n
+
+    def _generate(self, contents, config, use_cache=True, vault=None, on_field=None):
+        """Returns (response, cache_key). Cache entries are only written once a response passes the guards.
+
+        With a `vault` handle the first content (the data vault) is already held server-side, so only
+        the rest is sent; the response-cache key still covers the full logical contents. With `on_field`
+        the call is streamed (see _stream).
+        """
+        key = self.cache.key(self.active_model, contents, config) if self.cache else None
+        if key and use_cache:
+            hit = self.cache.get(key)
+            if hit: return hit, key
+        if self.cache and self.cache.mode == "replay":
+            raise CacheMiss(f"No cached response for {key[:12]} (replay mode)")
+        if vault:
+            contents, config = contents[1:], config.model_copy(update={"cached_content": vault})
+        if on_field: return self._stream(contents, config, on_field), key
+        resp = self.client.models.generate_content(model=self.active_model, contents=contents, config=config)
+        return resp, key
+
+    def _stream(self, contents, config, on_field):
+        """Streams a generation through JsonFieldScanner, calling `on_field(path, value)` per completed scalar.
+
+        A truthy return from on_field cancels the stream and raises StreamAborted, so an answer that
+        can't be repaired is not billed to the end. The response carries `ttff_s`
+        (time to first completed field).
+        """
+        scanner = JsonFieldScanner()
+        resp = SimpleNamespace(text="", usage_metadata=None, ttff_s=None)
+        parts, t0 = [], time.time()
+        stream = self.client.models.generate_content_stream(model=self.active_model, contents=contents, config=config)
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage_metadata", None) is not None: resp.usage_metadata = chunk.usage_metadata
+                text = chunk.text or ""
+                parts.append(text)
+                for path, value in scanner.feed(text):
+                    if resp.ttff_s is None: resp.ttff_s = time.time() - t0
+                    reason = on_field(path, value)
+                    if reason:
+                        resp.text = "".join(parts)
+                        raise StreamAborted(reason, path, resp)
+        finally:
+            close = getattr(stream, "close", None)
+            if close: close() # Stops the HTTP stream; no further tokens are generated
+        resp.text = "".join(parts)
+        return resp
+
+    def _vault_handle(self, vault_text):
+        """Gemini context-cache handle for the data vault, created once per (model, context); None if unavailable."""
+        if self.cache and self.cache.mode == "replay": return None
+        key = (self.active_model, hashlib.sha256(vault_text.encode("utf-8")).hexdigest())
+        with self._stats_lock: handle = self._vault_handles.get(key)
+        if handle is None:
+            from google.genai import types
+            try:
+                handle = self.client.caches.create(model=self.active_model, config=types.CreateCachedContentConfig(
+                    contents=[vault_text], ttl="900s")).name
+            except Exception as e: # Model without caching support, or vault under the minimum size
+                print(f"   (context cache unavailable: {type(e).__name__}; resending the vault)")
+                handle = ""
+            with self._stats_lock: self._vault_handles[key] = handle
+        return handle or None
+
+    def _set_path(self, data, path, value):
+        node = data
+        try:
+            for p in path[:-1]: node = node[p]
+            node[path[-1]] = value
+        except (KeyError, IndexError, TypeError):
+            pass
+
+    def _repair(self, res, chunks, redactor, company_real_name, sector, use_cache):
+        """One targeted call for just the failing fields; merges the fix into `res`, returns (res, ok)."""
+        from google.genai import types
+        missing = self.guard.missing_metrics(res)
+        leaks = self.guard.leaked_strings(res, company_real_name)
+        if not missing and not leaks: return res, False
+
+        query = " ".join([m.replace("_", " ") for m in missing] + [t for _, t in leaks])
+        excerpts, _ = self.context_builder.focused(chunks, query)
+        ask = {}
+        if missing: ask["metrics"] = {m.replace("_", " ").title(): "value with units, or N/A" for m in missing}
+        if leaks: ask["rewrites"] = {".".join(map(str, p)): t for p, t in leaks}
+        prompt = f"""
+        REPAIR TASK for "Project X" (sector: {sector}). A previous answer failed validation.
+        Fix ONLY the fields below using the excerpts; do not return anything else.
+        - "metrics": supply each missing slide_2 metric from the excerpts.
+        - "rewrites": rephrase each string neutrally, with no superlatives, market-position or company-name claims.
+        OUTPUT JSON: {json.dumps(ask)}
+        """
+        resp, cached, t0, outcome = None, False, time.time(), "ok"
+        try:
+            resp, key = self._generate([excerpts, prompt],
+                                       types.GenerateContentConfig(response_mime_type="application/json"), use_cache)
+            cached = getattr(resp, "from_cache", False)
+            fix, _ = redactor.redact_obj(json.loads(resp.text))
+            if isinstance(fix.get("metrics"), dict):
+                res.setdefault("slide_2", {}).setdefault("metrics", {}).update(fix["metrics"])
+            for path, text in (fix.get("rewrites") or {}).items():
+                self._set_path(res, [int(p) if p.isdigit() else p for p in path.split(".")], text)
+            ok1, m1 = self.guard.check_anonymity(res, company_real_name)
+            ok2, m2 = self.guard.validate(res)
+            if not (ok1 and ok2): outcome = "leak" if not ok1 else "invalid"
+            elif key and not cached: self.cache.put(key, self.active_model, resp)
+        except CacheMiss:
+            raise
+        except Exception as e:
+            outcome = f"error:{type(e).__name__}"
+        self.cost_tracker.record(self.active_model, time.time() - t0, 1, outcome, getattr(resp, "usage_metadata", None),
+                                 company_real_name, cached, kind="repair")
+        print(f"   🩹 Repair ({', '.join(ask)}): {outcome}")
+        return res, outcome == "ok"
+
+    def analyze_company(self, chunks, company_real_name, redactor=None):
+        with self._negotiate_lock:
+            if not self.active_model: self.test_api_connection()
         print(f"🤖 Analyzing via {self.active_model}...")
         
         # Sector Heuristic
-        scores = {k: 0 for k in self.SECTOR_DEFINITIONS}
-        sample = " ".join([c['text'].lower() for c in chunks[:15]])
-        for sec, kws in self.SECTOR_DEFINITIONS.items():
-            for w, weight in kws:
-                if w in sample: scores[sec] += (sample.count(w) * weight)
-        best_sec = max(scores, key=scores.get)
-        detected_sector = best_sec if scores[best_sec] > 5 else "General"
-        print(f"🧠 Sector: {detected_sector}")
-
-        context, _ = self._format_context_with_ids(chunks)
+        detected_sector, scores = self.detect_sector(chunks)
+        top = ", ".join(f"{k} {v}" for k, v in sorted(scores.items(), key=lambda kv: -kv[1])[:3] if v)
+        print(f"🧠 Sector: {detected_sector}" + (f" ({top})" if top else ""))
+
+        # Mask the name before the model ever sees it, so leaks are rare instead of retried
+        redactor = redactor or Redactor(company_real_name)
+        masked, hits = redactor.redact_chunks(chunks)
+        self._count_redaction("input_hits", hits)
+        if hits: print(f"🕶️ Redacted {hits} name/domain mentions from the context")
+
+        # Statement tables become a computed summary; slide_2 figures come from it, not the model
+        fin = self.financials.extract(masked)
+        fin_block = ""
+        if fin:
+            consumed = set(fin["consumed"])
+            fin_block = self.financials.summary(fin)
+            table_tokens = sum(estimate_tokens(c['text']) for c in masked if c['id'] in consumed)
+            print(f"📐 Financials: FY{fin['years'][0] % 100:02d}-FY{fin['years'][-1] % 100:02d} computed from "
+                  f"{len(consumed)} table chunks (~{table_tokens:,} tokens -> ~{estimate_tokens(fin_block):,})")
+            masked = [c for c in masked if c['id'] not in consumed]
+        context, _ = self._format_context_with_ids(masked)
+        context = fin_block + context
         
         prompt = f"""
         Strict M&A Analyst Task.
-        INPUT: Name: "{company_real_name}" (FORBIDDEN). Sector: {detected_sector}.
+        INPUT: Company "Project X" (real name masked in the context; never guess it). Sector: {detected_sector}.
         
         RULES:
-        1. ANONYMIZE: Replace "{company_real_name}" with "Project X".
+        1. ANONYMIZE: Refer to the company only as "Project X".
         2. CITATIONS: Use [ID]. In 'source_display', NEVER use filenames. Use "Internal Doc".
-        3. FINANCIALS: Extract 'Revenue', 'EBITDA' for latest available year.
+        3. FINANCIALS: {"Use the COMPUTED FINANCIALS block as given; never recompute it." if fin else "Extract 'Revenue', 'EBITDA' for latest available year."}
         4. OUTPUT JSON:
         {{
             "code_name": "Project X",
@@ -103,26 +341,80 @@ class AnalysisAgent:
         }}
         """
 
+        # Only an answer that can't be repaired is cancelled mid-stream: one that isn't a JSON object.
+        # Field leaks are noted and the full answer goes through the guards and _repair, which is far
+        # cheaper than regenerating (a model that keeps writing the same phrase would abort every attempt).
+        stream_leaks = []
+        def check_field(path, value):
+            if not path or isinstance(path[0], int): return "Not a JSON object"
+            if isinstance(value, str) and self.guard.field_violation(redactor.redact(value)[0], company_real_name):
+                stream_leaks.append(path)
+
+        from google.genai import types
+        use_cache, vault = True, None
         for attempt in range(3):
+            resp, cached, t0, latency = None, False, time.time(), None
+            track = lambda outcome: self.cost_tracker.record(
+                self.active_model, latency if latency is not None else time.time() - t0, attempt + 1, outcome,
+                getattr(resp, "usage_metadata", None), company_real_name, cached, kind="full",
+                ttff_s=round(resp.ttff_s, 3) if getattr(resp, "ttff_s", None) is not None else None)
             try:
                 print(f"⏳ Gen Attempt {attempt+1}...", end=" ", flush=True)
-                resp = self.client.models.generate_content(
-                    model=self.active_model, contents=[f"CONTEXT:\n{context}", prompt],
-                    config=types.GenerateContentConfig(response_mime_type="application/json")
+                # Full retries reuse the vault from Gemini's context cache instead of resending it
+                if attempt and vault is None: vault = self._vault_handle(f"CONTEXT:\n{context}") or False
+                resp, key = self._generate(
+                    [f"CONTEXT:\n{context}", prompt],
+                    types.GenerateContentConfig(response_mime_type="application/json"), use_cache, vault,
+                    on_field=check_field if self.stream else None
                 )
-                print("✅")
+                latency = time.time() - t0
+                cached = getattr(resp, "from_cache", False)
+                ttff = getattr(resp, "ttff_s", None)
+                print("✅ (cache)" if cached else f"✅ {latency:.1f}s" + (f" (first field {ttff:.1f}s)" if ttff else ""))
+                if stream_leaks:
+                    print(f"   🚩 Leak seen mid-stream at {', '.join('.'.join(map(str, p)) for p in stream_leaks)}")
+                    stream_leaks.clear()
                 
-                res = json.loads(resp.text)
-                res = self._sanitize(res, company_real_name)
+                raw = json.loads(resp.text)
+                res, out_hits = self._sanitize(raw, redactor)
+                res = self.financials.apply(res, fin)
                 
                 # Check Guardrails
                 ok1, m1 = self.guard.check_anonymity(res, company_real_name)
                 ok2, m2 = self.guard.validate(res)
                 
-                if ok1 and ok2: return res
+                if ok1 and ok2:
+                    track("ok")
+                    if out_hits:
+                        self._count_redaction("output_hits", out_hits)
+                        # The unmasked answer would have failed the name check and cost a regeneration
+                        if self.guard.check_anonymity(raw, company_real_name)[1] == "Name Leak":
+                            self._count_redaction("retries_avoided")
+                    if key and not cached: self.cache.put(key, self.active_model, resp)
+                    return res
+                track("leak" if not ok1 else "invalid")
                 print(f"   ⚠️ Validation: {m1} | {m2}")
+                # Fix just the failing fields before paying for another full generation
+                for _ in range(2):
+                    res, fixed = self._repair(res, masked, redactor, company_real_name, detected_sector, use_cache)
+                    if fixed:
+                        # The repaired answer is what passed the guards; a hit then needs no repair
+                        if key and not cached:
+                            self.cache.put(key, self.active_model, SimpleNamespace(
+                                text=json.dumps(res, ensure_ascii=False), usage_metadata=resp.usage_metadata))
+                        return res
+                # A stale entry that fails today's guards must not be replayed on retry
+                if cached: use_cache = False
             
+            except StreamAborted as e:
+                resp, latency = e.partial, time.time() - t0
+                track(f"aborted:{e.reason}")
+                print(f"🛑 Stream cancelled after {len(resp.text)} chars: {e}")
+            except CacheMiss as e:
+                print(f"❌ {e}")
+                return None
             except Exception as e:
+                track(f"error:{type(e).__name__}")
                 print(f"❌ {e}")
                 time.sleep(2)
         return None
\ No newline at end of file
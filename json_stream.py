@@ -0,0 +1,76 @@
+import json
+
+class StreamAborted(Exception):
+    """Raised from inside a streamed generation when a completed field fails a guard."""
+    def __init__(self, reason, path, partial):
+        super().__init__(f"{reason} at {'.'.join(map(str, path))}")
+        self.reason = reason
+        self.path = path
+        self.partial = partial # text / usage_metadata / ttff_s received before the cancel
+
+class JsonFieldScanner:
+    """Incremental JSON reader: feed it text as it streams in, get back each scalar as soon as it closes.
+
+    feed() returns [(path, value)], where path is a tuple of keys/indices such as
+    ("slide_1", "bullets", 0). Only scalars are reported; containers are implied by
+    their members. Malformed input is not validated here; json.loads on the full
+    text still has the final word.
+    """
+    def __init__(self):
+        self.stack = [] # frames: [is_object, key_or_index, awaiting_key]
+        self.in_str = False
+        self.escape = False
+        self.is_key = False
+        self.buf = []
+        self.literal = []
+
+    def _path(self):
+        return tuple(f[1] for f in self.stack)
+
+    def _flush_literal(self, out):
+        if not self.literal: return
+        raw, self.literal = "".join(self.literal), []
+        try: out.append((self._path(), json.loads(raw)))
+        except ValueError: pass
+
+    def feed(self, text):
+        out = []
+        for ch in text:
+            if self.in_str:
+                if self.escape:
+                    self.buf.append(ch)
+                    self.escape = False
+                elif ch == "\\":
+                    self.buf.append(ch)
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+                    try: value = json.loads('"' + "".join(self.buf) + '"')
+                    except ValueError: value = "".join(self.buf)
+                    if self.is_key:
+                        self.stack[-1][1], self.stack[-1][2] = value, False
+                    else:
+                        out.append((self._path(), value))
+                else:
+                    self.buf.append(ch)
+                continue
+            if ch == '"':
+                self.in_str, self.buf = True, []
+                self.is_key = bool(self.stack) and self.stack[-1][0] and self.stack[-1][2]
+            elif ch == "{":
+                self.stack.append([True, None, True])
+            elif ch == "[":
+                self.stack.append([False, 0, False])
+            elif ch in "}]":
+                self._flush_literal(out)
+                if self.stack: self.stack.pop()
+            elif ch == ",":
+                self._flush_literal(out)
+                if self.stack:
+                    if self.stack[-1][0]: self.stack[-1][2] = True
+                    else: self.stack[-1][1] += 1
+            elif ch in " \t\r\n:":
+                self._flush_literal(out)
+            else:
+                self.literal.append(ch)
+        return out
@@ -0,0 +1,65 @@
+import re
+from collections import Counter
+
+def _trie_pattern(node):
+    """Regex for a character trie; shared prefixes are matched once instead of once per keyword."""
+    end = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != ""]
+    if not branches: return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if end: body = "(?:" + body + ")?"
+    return body
+
+def compile_keywords(terms, plurals=False):
+    """One case-insensitive word-boundary regex covering every term (phrases allowed)."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term.lower(): node = node.setdefault(ch, {})
+        node[""] = True
+    suffix = r"(?:e?s)?" if plurals else ""
+    return re.compile(r"(?<!\w)(" + _trie_pattern(trie) + ")" + suffix + r"(?!\w)", re.IGNORECASE)
+
+class KeywordMatcher:
+    """Finds many keywords in a single scan of the text.
+
+    `terms` maps keyword -> payload (e.g. a sector and weight). The keywords are
+    folded into one trie-shaped regex, so adding terms to the dictionary does not
+    add passes over the corpus; word boundaries stop "api" matching "capital".
+    """
+    def __init__(self, terms, plurals=False):
+        self.terms = {t.lower(): p for t, p in terms.items()}
+        self.regex = compile_keywords(self.terms, plurals) if self.terms else None
+
+    def finditer(self, text):
+        """Yields (start, end, keyword, payload) for every hit, left to right."""
+        if not self.regex or not text: return
+        for m in self.regex.finditer(text):
+            kw = m.group(1).lower()
+            yield m.start(), m.end(), kw, self.terms[kw]
+
+    def counts(self, text):
+        return Counter(kw for _, _, kw, _ in self.finditer(text))
+
+class SectorScorer:
+    """Weighted sector scores over every chunk of a data room in one pass per chunk."""
+    def __init__(self, definitions, threshold=5):
+        self.threshold = threshold
+        self.sectors = list(definitions)
+        terms = {}
+        for sec, kws in definitions.items():
+            for w, weight in kws: terms.setdefault(w.lower(), []).append((sec, weight))
+        self.matcher = KeywordMatcher(terms, plurals=True)
+
+    def score(self, chunks):
+        scores = {s: 0 for s in self.sectors}
+        for c in chunks:
+            for kw, n in self.matcher.counts(c.get('text', '')).items():
+                for sec, weight in self.matcher.terms[kw]: scores[sec] += n * weight
+        return scores
+
+    def classify(self, chunks):
+        """(sector, scores); "General" unless the best sector clears the threshold."""
+        scores = self.score(chunks)
+        best = max(scores, key=scores.get) if scores else None
+        return (best if best and scores[best] > self.threshold else "General"), scores
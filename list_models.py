@@ -1,7 +1,16 @@
 import os
 import sys
+import argparse
 from google import genai
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--probe", action="store_true",
+                    help="Measure latency / throughput / JSON mode for AnalysisAgent.PRIORITY_MODELS and cache the ranking")
+parser.add_argument("--rounds", type=int, default=2, help="Probe calls per model (best latency kept)")
+parser.add_argument("--cache", default=".cache/model_probe.json", help="Probe result file read by AnalysisAgent")
+parser.add_argument("--ttl", type=int, default=24 * 3600, help="Seconds the probe result stays valid")
+args = parser.parse_args()
+
 # Get Key
 key = os.getenv("GEMINI_API_KEY")
 if not key:
@@ -13,6 +22,20 @@ print("d📡 Connecting to Google AI...")
 
 try:
     client = genai.Client(api_key=key)
+
+    if args.probe:
+        from intelligence import AnalysisAgent
+        from model_probe import ModelProbe
+        candidates = AnalysisAgent(key, telemetry_log=None, probe_cache=None).PRIORITY_MODELS
+        print(f"\n⏱️ PROBING {len(candidates)} MODELS ({args.rounds} rounds each):")
+        print("===================")
+        for r in ModelProbe(args.cache, ttl=args.ttl).probe(client, candidates, rounds=args.rounds):
+            status = "✅" if r["ok"] and r["json_mode"] else "⚠️" if r["ok"] else "❌"
+            tps = f"{r['tokens_per_s']} tok/s" if r["tokens_per_s"] else "- tok/s"
+            print(f"{status} {r['model']}: {r['latency_s']}s, {tps}, json={r['json_mode']}"
+                  + (f" ({r['error']})" if r["error"] else ""))
+        print(f"\n💾 Ranking saved to {args.cache} (valid {args.ttl / 3600:g}h)")
+        sys.exit(0)
     
     print("\n📋 AVAILABLE MODELS:")
     print("===================")
@@ -24,4 +47,4 @@ try:
             print(f"✅ {m.name}")
             
 except Exception as e:
-    print(f"\n❌ CRITICAL ERROR: {str(e)}")
\ No newline at end of file
+    print(f"\n❌ CRITICAL ERROR: {str(e)}")
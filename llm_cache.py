@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+
+class CacheMiss(Exception):
+    pass
+
+class CachedResponse:
+    """Stands in for a genai response: exposes `.text` and `.usage_metadata`."""
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(**usage) if usage else None
+        self.from_cache = True
+
+class ResponseCache:
+    """Content-addressed on-disk store for LLM responses.
+
+    Modes:
+      on      - read and write (default)
+      refresh - ignore existing entries, overwrite with fresh responses
+      off     - bypass entirely (--no-cache)
+      replay  - read only; a miss raises CacheMiss instead of calling the API
+    """
+    MODES = ("on", "refresh", "off", "replay")
+
+    def __init__(self, cache_dir=".cache/llm", mode="on", max_bytes=512 * 1024 * 1024, max_age_days=30):
+        if mode not in self.MODES: raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        if mode != "off": os.makedirs(cache_dir, exist_ok=True)
+
+    def _config_repr(self, config):
+        if config is None: return None
+        if hasattr(config, "model_dump"): return config.model_dump(mode="json", exclude_none=True)
+        return repr(config)
+
+    def key(self, model, contents, config=None):
+        payload = json.dumps({"model": model, "contents": contents, "config": self._config_repr(config)},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        if self.mode in ("off", "refresh"): return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock: self.misses += 1
+            return None
+        if self.max_age and time.time() - entry.get("created", 0) > self.max_age and self.mode != "replay":
+            with self._lock: self.misses += 1
+            return None
+        os.utime(path) # mtime doubles as last-access time for LRU eviction
+        with self._lock: self.hits += 1
+        return CachedResponse(entry["text"], entry.get("usage"))
+
+    def put(self, key, model, resp):
+        if self.mode in ("off", "replay"): return
+        usage = None
+        um = getattr(resp, "usage_metadata", None)
+        if um is not None:
+            usage = {k: getattr(um, k, None) for k in ("prompt_token_count", "candidates_token_count",
+                                                       "total_token_count", "cached_content_token_count")}
+        entry = {"model": model, "created": time.time(), "text": resp.text, "usage": usage}
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with open(os.path.join(self.cache_dir, "last_model"), "w") as f:
+            f.write(model)
+        with self._lock:
+            self._writes += 1
+            due = self._writes % 20 == 1
+        if due: self.evict()
+
+    def last_model(self):
+        try:
+            with open(os.path.join(self.cache_dir, "last_model")) as f: return f.read().strip() or None
+        except OSError: return None
+
+    def evict(self):
+        """Drops entries past max age, then least-recently-used ones until under max_bytes."""
+        now = time.time()
+        entries, total, removed = [], 0, 0
+        for root, _, files in os.walk(self.cache_dir):
+            for fn in files:
+                if not fn.endswith(".json"): continue
+                p = os.path.join(root, fn)
+                try: st = os.stat(p)
+                except OSError: continue
+                if self.max_age and now - st.st_mtime > self.max_age:
+                    try: os.remove(p); removed += 1
+                    except OSError: pass
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, size, p = entries.pop(0)
+            try: os.remove(p); removed += 1
+            except OSError: pass
+            total -= size
+        return removed
@@ -2,27 +2,27 @@ import os
 import argparse
 import sys
 import re
+import time
+import importlib.util
 from intelligence import AnalysisAgent
 from ppt_generator import PPTGenerator
 from visual_engine import VisualEngine
 from data_loader import UniversalLoader
+from pipeline import Stage, StagedPipeline
+from llm_cache import ResponseCache
+from asset_store import AssetStore
+from redaction import Redactor
+from dedup import NearDuplicateFilter
+from chunk_vault import ChunkVault
 
 # 1. ENV VAR CHECK
 GEMINI_KEY = os.getenv("GEMINI_API_KEY") or "YOUR_GEMINI_KEY"
 PEXELS_KEY = os.getenv("PEXELS_API_KEY") or "YOUR_PEXELS_KEY"
 
-# Graceful docx import
-try:
-    from docx import Document
-    HAS_DOCX = True
-except ImportError:
-    HAS_DOCX = False
-
-if "YOUR_" in GEMINI_KEY:
-    print("❌ ERROR: Please set GEMINI_API_KEY environment variable.")
-    sys.exit(1)
+# Graceful docx import (checked without importing; python-docx loads only when a citation doc is written)
+HAS_DOCX = importlib.util.find_spec("docx") is not None
 
-def generate_citation_doc(strategy_data, chunks, output_path):
+def generate_citation_doc(strategy_data, chunks, output_path, vault=None):
     if not HAS_DOCX:
         with open(output_path.replace('.docx', '.txt'), 'w', encoding='utf-8') as f:
             f.write(f"CITATION REPORT - {strategy_data.get('code_name')}\n")
@@ -30,10 +30,13 @@ def generate_citation_doc(strategy_data, chunks, output_path):
                 f.write(f"CLAIM: {c.get('claim')}\nSOURCE: {c.get('source_display')}\nID: {c.get('id')}\n\n")
         return
 
+    from docx import Document
     doc = Document()
     doc.add_heading(f"Citation Document - {strategy_data.get('code_name')}", 0)
     
-    chunk_map = {c['id']: c for c in chunks}
+    # Cited chunks come straight from the vault when there is one; no re-ingest, no full map
+    cited = [c.get('id') for c in strategy_data.get('citations', [])]
+    chunk_map = vault.get_many(cited) if vault else {c['id']: c for c in chunks}
     
     for cite in strategy_data.get('citations', []):
         claim = cite.get('claim', 'Claim')
@@ -52,14 +55,18 @@ def generate_citation_doc(strategy_data, chunks, output_path):
     doc.save(output_path)
     print(f"✅ Citation Doc saved: {output_path}")
 
-def assess_data_quality(chunks):
+def assess_data_quality(chunks, cache_stats=None):
     quality = {
         "private": len([c for c in chunks if 'private' in c['type']]),
         "web": len([c for c in chunks if 'public' in c['type']]),
         "financial": len([c for c in chunks if 'financial' in c['type']]),
         "total": len(chunks)
     }
-    print(f"📊 DATA QUALITY: {quality['total']} chunks (Pvt: {quality['private']}, Web: {quality['web']}, Fin: {quality['financial']})")
+    line = f"📊 DATA QUALITY: {quality['total']} chunks (Pvt: {quality['private']}, Web: {quality['web']}, Fin: {quality['financial']})"
+    if cache_stats:
+        quality["cache_hits"], quality["cache_misses"] = cache_stats["hits"], cache_stats["misses"]
+        line += f" | Doc cache: {cache_stats['hits']} hit / {cache_stats['misses']} miss"
+    print(line)
     return quality
 
 def clean_company_name(filename):
@@ -69,97 +76,216 @@ def clean_company_name(filename):
     base = re.sub(r'[-_ ]?(OnePager|Pitch|Deck|Teaser|Report|Analysis)', '', base, flags=re.IGNORECASE)
     return base.strip()
 
-def process_company(file_path, loader, agent, visual, builder):
+def find_website(file_path):
+    """The company URL under the one-pager's `## Website` header, or None."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        url_match = re.search(r'##\s*Website.*?(https?://[^\s<>\)\"]+)', f.read(), re.IGNORECASE | re.DOTALL)
+    return url_match.group(1) if url_match else None
+
+def ingest_company(job, loader, dedup=None, vault=None):
+    file_path = job["file"]
     c_name = clean_company_name(file_path)
+    job["company"] = c_name
     print(f"\n🚀 Processing: {c_name} (File: {os.path.basename(file_path)})")
+    if vault: job["vault"] = vault.db_path
+
+    # Re-analysis: the stored data room is reused as-is
+    if vault and job.get("from_vault"):
+        chunks = vault.company_chunks(c_name)
+        if chunks:
+            print(f"🗄️ Loaded {len(chunks)} chunks from the vault (no re-ingest)")
+            # The website feeds the redactor, so stored web chunks are masked like on the first run
+            try: website = vault.website(c_name) or find_website(file_path)
+            except OSError: website = None
+            if website: job["website"] = website
+            assess_data_quality(chunks)
+            job["chunks"] = chunks
+            return job
+        print("⚠️ Not in the vault yet; ingesting")
     
     # A. Ingest Private Data
     chunks = loader.load_data(file_path)
     
     # B. EXTRACT PUBLIC URL
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            url_match = re.search(r'##\s*Website.*?(https?://[^\s<>\)\"]+)', content, re.IGNORECASE | re.DOTALL)
-            if url_match:
-                target_url = url_match.group(1)
-                print(f"🌍 Found Website: {target_url} -> Scraping...")
-                web_chunks = loader.load_data(target_url)
-                chunks.extend(web_chunks)
+        target_url = find_website(file_path)
+        if target_url:
+            print(f"🌍 Found Website: {target_url} -> Scraping...")
+            job["website"] = target_url
+            web_chunks = loader.load_data(target_url)
+            chunks.extend(web_chunks)
     except Exception as e:
         print(f"⚠️ Warning: URL extraction error: {e}")
 
     if not chunks:
         print("❌ No data found.")
-        return {"success": False, "company": c_name, "cost": 0}
+        job.update(success=False, cost=0)
+        return job
 
-    assess_data_quality(chunks)
+    # The one-pager and the website repeat each other; keep one copy (private/financial wins)
+    chunks, rep = (dedup or NearDuplicateFilter()).filter(chunks)
+    if rep["removed"]:
+        print(f"🧹 Near-duplicates: dropped {rep['removed']} chunks "
+              f"({rep['bytes_removed'] / 1024:.1f} KB, ~{rep['tokens_removed']:,} tokens)")
+    job["dedup"] = rep
+    if vault: vault.put(c_name, chunks, job.get("website"))
 
-    # C. Analyze
-    data = agent.analyze_company(chunks, c_name)
+    assess_data_quality(chunks, loader.doc_cache.stats() if loader.doc_cache else None)
+    job["chunks"] = chunks
+    return job
+
+def analyze_stage(job, agent):
+    c_name = job["company"]
+    redactor = Redactor(c_name, websites=[job["website"]] if job.get("website") else ())
+    data = agent.analyze_company(job["chunks"], c_name, redactor)
+    job["cost"] = agent.cost_tracker.company_cost(c_name)
     
     if not data: 
         print("❌ Agent Analysis Failed (Check logs above).")
-        return {"success": False, "company": c_name, "cost": agent.cost_tracker.session_cost}
+        job["success"] = False
+        return job
+    job["data"] = data
+    return job
 
-    # D. Visuals
-    imgs = []
+def visuals_stage(job, visual):
+    data, c_name = job["data"], job["company"]
     sec = data.get('sector', 'General')
     kws = data.get('visual_keywords', ['business'])
-    for i in range(3):
-        kw = kws[i] if i < len(kws) else 'office'
-        u = visual.fetch_image(kw, sec, slide_index=i+1)
-        if u:
-            fn = f"temp_{c_name}_{i}.jpg"
-            visual.download_image(u, fn)
-            imgs.append(fn)
-        else: imgs.append(None)
+    # Only slots the deck actually places get fetched, each sized to its slot by the asset store
+    slots = PPTGenerator.IMAGE_SLOTS
+    kws = [kws[i] if i < len(kws) else 'office' for i in range(len(slots))]
+    job["images"] = visual.fetch_images(kws, sec, slots=slots)
+    job["temp_images"] = visual.assets is None # Downloaded to temp files rather than served from the store
+
+    # Only cited chunks are needed downstream; with a vault the render process looks them up itself
+    cited = {c.get('id') for c in job["data"].get('citations', [])}
+    job["chunks"] = [] if job.get("vault") else [c for c in job["chunks"] if c['id'] in cited]
+    return job
+
+def render_stage(job, builder=None):
+    """CPU-bound step; runs in a worker process during batch runs."""
+    if builder is None: builder = PPTGenerator()
+    data, c_name, imgs = job["data"], job["company"], job["images"]
 
     # E. Outputs
     out_ppt = f"Output_{c_name}.pptx"
     out_doc = f"Citations_{c_name}.docx" if HAS_DOCX else f"Citations_{c_name}.txt"
     
-    builder.generate_ppt(data, imgs, out_ppt)
-    generate_citation_doc(data, chunks, out_doc)
-    
+    builder.generate_ppt(data, list(imgs), out_ppt)
+    generate_citation_doc(data, job["chunks"], out_doc, ChunkVault(job["vault"]) if job.get("vault") else None)
+
     # F. Cleanup Temps
-    for img in imgs:
-        if img and os.path.exists(img):
-            try: os.remove(img)
-            except: pass
+    if job.get("temp_images"):
+        for img in imgs:
+            if img and os.path.exists(img):
+                try: os.remove(img)
+                except OSError: pass
+        for d in {os.path.dirname(img) for img in imgs if img}:
+            try: os.rmdir(d)
+            except OSError: pass
     
-    return {"success": True, "company": c_name, "cost": agent.cost_tracker.session_cost}
+    job["success"] = True
+    return job
+
+def _summary(job):
+    return {"success": bool(job.get("success")), "company": job.get("company", os.path.basename(job["file"])),
+            "cost": job.get("cost", 0), "timings": job.get("timings", {})}
+
+def process_company(file_path, loader, agent, visual, builder, dedup=None, vault=None, from_vault=False):
+    job = {"file": file_path, "timings": {}, "from_vault": from_vault}
+    steps = [("ingest", lambda j: ingest_company(j, loader, dedup, vault)), ("analyze", lambda j: analyze_stage(j, agent)),
+             ("visuals", lambda j: visuals_stage(j, visual)), ("render", lambda j: render_stage(j, builder))]
+    for name, step in steps:
+        t0 = time.time()
+        job = step(job)
+        job["timings"][name] = time.time() - t0
+        if job.get("success") is False: break
+    return _summary(job)
+
+def process_folder(folder, loader, agent, visual, workers=4, render_workers=2, dedup=None, vault=None,
+                   from_vault=False):
+    """Ingest -> analyze -> visuals -> render, each stage with its own bounded pool."""
+    files = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+             if f.endswith(('.md', '.pdf', '.docx', '.xlsx'))]
+    pipe = StagedPipeline([
+        Stage("ingest", lambda j: ingest_company(j, loader, dedup, vault), workers=workers),
+        Stage("analyze", lambda j: analyze_stage(j, agent), workers=workers),
+        Stage("visuals", lambda j: visuals_stage(j, visual), workers=workers),
+        Stage("render", render_stage, workers=render_workers, processes=True),
+    ])
+    return [_summary(j) for j in pipe.run({"file": f, "from_vault": from_vault} for f in files)]
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", help="Single file")
     parser.add_argument("--folder", help="Batch folder")
+    parser.add_argument("--workers", type=int, default=4, help="Threads per network-bound stage (batch mode)")
+    parser.add_argument("--render-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Render processes (batch mode)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached LLM responses and overwrite them")
+    parser.add_argument("--replay", action="store_true", help="Serve LLM responses from cache only; never call the API")
+    parser.add_argument("--cache-dir", default=".cache/llm", help="LLM response cache directory")
+    parser.add_argument("--token-budget", type=int, default=24000, help="Max estimated prompt tokens for the data vault")
+    parser.add_argument("--telemetry-log", default="logs/llm_calls.jsonl", help="JSONL log of every LLM call")
+    parser.add_argument("--probe-cache", default=".cache/model_probe.json",
+                        help="Model ranking written by list_models.py --probe (its --ttl is stored in the file)")
+    parser.add_argument("--image-dpi", type=int, default=150, help="Resolution images are resized to for their slide slot")
+    parser.add_argument("--chunk-tokens", type=int, default=800, help="Target estimated tokens per chunk (all readers)")
+    parser.add_argument("--chunk-overlap", type=int, default=80, help="Tokens shared by consecutive prose chunks")
+    parser.add_argument("--no-doc-cache", action="store_true", help="Re-parse every source file")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="Similarity at which chunks count as near-duplicates (0 disables)")
+    parser.add_argument("--vault", default=".cache/vault.sqlite", help="SQLite chunk vault shared by every company")
+    parser.add_argument("--no-vault", action="store_true", help="Keep chunks in memory only")
+    parser.add_argument("--from-vault", action="store_true", help="Re-analyse stored chunks instead of re-ingesting")
+    parser.add_argument("--search", help="Full-text search across every company in the vault, then exit")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for whole LLM answers instead of streaming them")
+    parser.add_argument("--http-ttl", type=int, default=6 * 3600, help="Seconds before cached web pages are revalidated")
+    parser.add_argument("--crawl-pages", type=int, default=12, help="Max pages crawled per company website (1 = start URL only)")
+    parser.add_argument("--crawl-depth", type=int, default=2, help="Max link hops from the start URL")
+    parser.add_argument("--crawl-seconds", type=float, default=20.0, help="Time budget per website crawl")
     args = parser.parse_args()
 
+    vault = None if args.no_vault else ChunkVault(args.vault)
+    if args.search:
+        if not vault: sys.exit("❌ --search needs the vault")
+        for c in vault.search(args.search):
+            print(f"[{c['id']}] {c['company']} | {c['source']} ({c['location']})\n    {c['text'][:160]}")
+        return
+
+    cache_mode = "replay" if args.replay else "off" if args.no_cache else "refresh" if args.refresh else "on"
+    if "YOUR_" in GEMINI_KEY and cache_mode != "replay":
+        print("❌ ERROR: Please set GEMINI_API_KEY environment variable.")
+        sys.exit(1)
+
     # 1. Initialize
-    loader = UniversalLoader()
-    agent = AnalysisAgent(GEMINI_KEY)
-    visual = VisualEngine(PEXELS_KEY)
+    loader = UniversalLoader(cache_path=None if args.no_doc_cache else ".cache/chunks.sqlite", http_ttl=args.http_ttl,
+                             chunk_tokens=args.chunk_tokens, chunk_overlap=args.chunk_overlap,
+                             crawl_pages=args.crawl_pages, crawl_depth=args.crawl_depth,
+                             crawl_seconds=args.crawl_seconds)
+    agent = AnalysisAgent(GEMINI_KEY, cache=ResponseCache(args.cache_dir, mode=cache_mode),
+                          token_budget=args.token_budget, telemetry_log=args.telemetry_log, stream=not args.no_stream,
+                          probe_cache=args.probe_cache)
+    visual = VisualEngine(PEXELS_KEY, assets=AssetStore(".cache/assets", dpi=args.image_dpi))
     builder = PPTGenerator()
+    dedup = NearDuplicateFilter(threshold=args.dedup_threshold)
     
-    # 2. Pre-flight Check
+    # 2. Model selection (served from the probe cache when fresh; no generate call either way)
     if not agent.test_api_connection():
         sys.exit(1)
 
     # 3. Process
     results = []
     if args.folder:
-        for f in os.listdir(args.folder):
-            if f.endswith(('.md', '.pdf', '.docx', '.xlsx')):
-                agent.cost_tracker.session_cost = 0 
-                res = process_company(os.path.join(args.folder, f), loader, agent, visual, builder)
-                results.append(res)
+        results = process_folder(args.folder, loader, agent, visual, args.workers, args.render_workers, dedup,
+                                 vault, args.from_vault)
     elif args.file:
-        res = process_company(args.file, loader, agent, visual, builder)
+        res = process_company(args.file, loader, agent, visual, builder, dedup, vault, args.from_vault)
         results.append(res)
     else:
         if os.path.exists("Centum-OnePager.md"):
-            res = process_company("Centum-OnePager.md", loader, agent, visual, builder)
+            res = process_company("Centum-OnePager.md", loader, agent, visual, builder, dedup, vault, args.from_vault)
             results.append(res)
 
     print("\n" + "="*50)
@@ -169,8 +295,15 @@ def main():
         status = "✅" if r['success'] else "❌"
         cost = r['cost']
         total_cost += cost
-        print(f"{status} {r['company']}: ₹{cost:.2f}")
+        stages = " ".join(f"{k}={v:.1f}s" for k, v in r['timings'].items())
+        print(f"{status} {r['company']}: ₹{cost:.2f}  [{stages}]")
     print(f"TOTAL RUN COST: ₹{total_cost:.2f}")
+    agent.cost_tracker.print_summary()
+    rs = agent.redaction_stats
+    print(f"REDACTION: {rs['input_hits']} mentions masked in context, {rs['output_hits']} in output, "
+          f"{rs['retries_avoided']} leak retries avoided")
+    if agent.cache.mode != "off":
+        print(f"LLM CACHE: {agent.cache.hits} hits / {agent.cache.misses} misses ({agent.cache.mode})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+import json
+import time
+
+PROBE_PROMPT = 'Return JSON only: {"status": "ok", "items": ["alpha", "beta", "gamma"]}'
+
+class ModelProbe:
+    """Measures candidate Gemini models once and caches a ranked result with a TTL.
+
+    The expiry is written into the cache file, so the TTL the probe ran with holds
+    for every reader; `ttl` only dates files that predate that.
+
+    Each candidate gets one small JSON-mode call: latency, output tokens/sec and
+    whether the reply parsed as JSON are recorded. AnalysisAgent reads the cache
+    to pick a model without any pre-flight call of its own.
+    """
+    def __init__(self, cache_path=".cache/model_probe.json", ttl=24 * 3600):
+        self.cache_path = cache_path
+        self.ttl = ttl
+
+    def _resolve(self, client, candidates):
+        try: remotes = [m.name.replace("models/", "") for m in client.models.list()]
+        except Exception: remotes = []
+        resolved = []
+        for c in candidates:
+            matches = [m for m in remotes if c in m]
+            resolved.append(matches[0] if matches else c)
+        return resolved
+
+    def _probe_one(self, client, model):
+        from google.genai import types
+        rec = {"model": model, "ok": False, "json_mode": False, "latency_s": None, "tokens_per_s": None, "error": None}
+        t0 = time.time()
+        try:
+            resp = client.models.generate_content(
+                model=model, contents=PROBE_PROMPT,
+                config=types.GenerateContentConfig(response_mime_type="application/json", max_output_tokens=64))
+            rec["latency_s"] = round(time.time() - t0, 3)
+            rec["ok"] = True
+            out_tok = getattr(getattr(resp, "usage_metadata", None), "candidates_token_count", None) or 0
+            if out_tok and rec["latency_s"]: rec["tokens_per_s"] = round(out_tok / rec["latency_s"], 1)
+            try:
+                rec["json_mode"] = isinstance(json.loads(resp.text), dict)
+            except (TypeError, ValueError):
+                pass
+        except Exception as e:
+            rec["latency_s"] = round(time.time() - t0, 3)
+            rec["error"] = str(e)[:200]
+        return rec
+
+    def probe(self, client, candidates, rounds=2):
+        """Probes every candidate `rounds` times (best latency kept), ranks, persists and returns the list."""
+        results = []
+        for model in self._resolve(client, candidates):
+            runs = [self._probe_one(client, model) for _ in range(rounds)]
+            good = [r for r in runs if r["ok"]]
+            best = min(good, key=lambda r: r["latency_s"]) if good else runs[-1]
+            best["json_mode"] = any(r["json_mode"] for r in good)
+            results.append(best)
+        results.sort(key=lambda r: (not r["ok"], not r["json_mode"], r["latency_s"] or 1e9))
+        if os.path.dirname(self.cache_path): os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "w") as f:
+            now = time.time()
+            json.dump({"probed_at": now, "expires_at": now + self.ttl, "results": results}, f, indent=2)
+        return results
+
+    def load(self):
+        """Ranked results if the cache exists and is within TTL, else None."""
+        try:
+            with open(self.cache_path) as f: data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() > data.get("expires_at", data.get("probed_at", 0) + self.ttl): return None
+        return data.get("results")
+
+    def best(self):
+        ranked = self.load() or []
+        healthy = [r for r in ranked if r["ok"] and r["json_mode"]]
+        return healthy[0]["model"] if healthy else None
@@ -0,0 +1,86 @@
+import queue
+import threading
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_STOP = object()
+
+class Stage:
+    """One step of the batch pipeline.
+
+    Each stage owns a bounded input queue (backpressure: upstream workers block
+    when it is full) and its own worker pool. `processes=True` runs `fn` in a
+    worker process, for CPU-bound steps like python-pptx rendering; those are
+    spawned, since forking while the other stages' threads hold locks can
+    deadlock the child.
+    """
+    def __init__(self, name, fn, workers=2, queue_size=None, processes=False):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+        self.processes = processes
+
+class StagedPipeline:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def _worker(self, idx, inbox, outbox, done, pool):
+        stage = self.stages[idx]
+        while True:
+            job = inbox.get()
+            if job is _STOP: return
+            t0 = time.time()
+            try:
+                if pool: job = pool.submit(stage.fn, job).result()
+                else: job = stage.fn(job)
+            except Exception as e:
+                print(f"❌ [{stage.name}] {job.get('company', '?')}: {e}")
+                job["success"] = False
+                job["error"] = f"{stage.name}: {e}"
+            job.setdefault("timings", {})[stage.name] = time.time() - t0
+
+            # Failed jobs skip the remaining stages
+            if job.get("success") is False or outbox is None: done.put(job)
+            else: outbox.put(job)
+
+    def _close_after(self, threads, outbox, n_next):
+        for t in threads: t.join()
+        if outbox is not None:
+            for _ in range(n_next): outbox.put(_STOP)
+
+    def run(self, jobs):
+        jobs = list(jobs)
+        queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        done = queue.Queue()
+        ctx = multiprocessing.get_context("spawn")
+        pools = [ProcessPoolExecutor(max_workers=s.workers, mp_context=ctx) if s.processes else None
+                 for s in self.stages]
+        closers = []
+        try:
+            for i, stage in enumerate(self.stages):
+                outbox = queues[i + 1] if i + 1 < len(self.stages) else None
+                threads = [threading.Thread(target=self._worker, args=(i, queues[i], outbox, done, pools[i]),
+                                            name=f"{stage.name}-{w}", daemon=True)
+                           for w in range(stage.workers)]
+                for t in threads: t.start()
+                n_next = self.stages[i + 1].workers if outbox is not None else 0
+                closer = threading.Thread(target=self._close_after, args=(threads, outbox, n_next), daemon=True)
+                closer.start()
+                closers.append(closer)
+
+            # Feeding blocks once the first stage's queue is full
+            for i, job in enumerate(jobs):
+                job.setdefault("index", i)
+                queues[0].put(job)
+            for _ in range(self.stages[0].workers): queues[0].put(_STOP)
+
+            for c in closers: c.join()
+        finally:
+            for p in pools:
+                if p: p.shutdown()
+
+        results = []
+        while not done.empty(): results.append(done.get())
+        return sorted(results, key=lambda j: j["index"])
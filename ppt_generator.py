@@ -1,15 +1,19 @@
 import os
+import re
 import math
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.chart.data import CategoryChartData
-from pptx.enum.chart import XL_CHART_TYPE
-from pptx.enum.shapes import MSO_SHAPE
+import copy
+import threading
 
 class PPTGenerator:
-    def __init__(self):
+    # Picture slots (width, height in inches) by image index; images without a slot are never placed
+    IMAGE_SLOTS = [(3.3, 2.2)]
+    # Static chrome, built once per process and cloned into every slide in compiled mode
+    _FRAGMENTS = {}
+    _FRAGMENTS_LOCK = threading.Lock()
+
+    def __init__(self, compiled=True):
+        from pptx.dml.color import RGBColor
+        self.compiled = compiled
         # Professional Color Palette (Deep Navy / Clean Grey / Vibrant Accent)
         self.NAVY = RGBColor(10, 25, 60)       # Dark Corporate Blue
         self.ACCENT = RGBColor(220, 50, 100)   # Sharp Pink/Red for highlights
@@ -21,6 +25,7 @@ class PPTGenerator:
         self.SUCCESS = RGBColor(34, 139, 34)
 
     def _fmt(self, p, text, size, bold=False, color=None, font="Arial"):
+        from pptx.util import Pt
         p.text = str(text) if text else ""
         p.font.size = Pt(size)
         p.font.bold = bold
@@ -28,6 +33,8 @@ class PPTGenerator:
         if color: p.font.color.rgb = color
 
     def _footer(self, slide, page_num):
+        from pptx.util import Inches
+        from pptx.enum.shapes import MSO_SHAPE
         # Thin divider line
         line = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0.5), Inches(7.1), Inches(9), Inches(0.01))
         line.fill.solid()
@@ -39,13 +46,12 @@ class PPTGenerator:
         self._fmt(p, "Strictly Private & Confidential – Prepared by Kelp M&A Team", 8, color=self.TEXT_LIGHT)
         
         # Page Number
-        if page_num > 0:
-            sn = slide.shapes.add_textbox(Inches(9.0), Inches(7.15), Inches(0.5), Inches(0.4))
-            p2 = sn.text_frame.paragraphs[0]
-            self._fmt(p2, str(page_num), 9, color=self.TEXT_LIGHT)
-            p2.alignment = PP_ALIGN.RIGHT
+        if page_num > 0: self._page_number(slide, page_num)
 
     def _header(self, slide, text):
+        from pptx.util import Inches
+        from pptx.enum.text import MSO_ANCHOR
+        from pptx.enum.shapes import MSO_SHAPE
         # Header Strip
         sh = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, Inches(0.3), Inches(10), Inches(0.6))
         sh.fill.solid()
@@ -65,7 +71,78 @@ class PPTGenerator:
         tf.margin_left = Inches(0.4)
         tf.vertical_anchor = MSO_ANCHOR.MIDDLE
 
+    def _page_number(self, slide, page_num):
+        from pptx.util import Inches
+        from pptx.enum.text import PP_ALIGN
+        sn = slide.shapes.add_textbox(Inches(9.0), Inches(7.15), Inches(0.5), Inches(0.4))
+        p2 = sn.text_frame.paragraphs[0]
+        self._fmt(p2, str(page_num), 9, color=self.TEXT_LIGHT)
+        p2.alignment = PP_ALIGN.RIGHT
+
+    def _stats_strip(self, slide):
+        from pptx.util import Inches
+        from pptx.dml.color import RGBColor
+        from pptx.enum.text import PP_ALIGN
+        from pptx.enum.shapes import MSO_SHAPE
+        strip = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0.5), Inches(5.9), Inches(9), Inches(1.0))
+        strip.fill.solid()
+        strip.fill.fore_color.rgb = self.NAVY
+        strip.line.fill.background()
+        
+        # Fake stats for visual density (if real ones missing)
+        stats = [("Global Reach", "45+ Countries"), ("Industry Rank", "Top 10"), ("Workforce", "500+")]
+        x_stat = Inches(0.8)
+        for label, val in stats:
+            tf = slide.shapes.add_textbox(x_stat, Inches(6.0), Inches(2.5), Inches(0.8)).text_frame
+            p_lbl = tf.paragraphs[0]
+            p_lbl.alignment = PP_ALIGN.CENTER
+            self._fmt(p_lbl, label.upper(), 9, color=RGBColor(200,200,200))
+            
+            p_val = tf.add_paragraph()
+            p_val.alignment = PP_ALIGN.CENTER
+            self._fmt(p_val, val, 16, bold=True, color=self.WHITE)
+            x_stat += Inches(3.0)
+
+    def _fragment(self, name):
+        """Shape XML for a static block, rendered once on a scratch slide and cached per process."""
+        from pptx import Presentation
+        with self._FRAGMENTS_LOCK:
+            if name not in self._FRAGMENTS:
+                scratch = Presentation()
+                slide = scratch.slides.add_slide(scratch.slide_layouts[6])
+                if name == "chrome":
+                    self._header(slide, "")
+                    self._footer(slide, 0)
+                elif name == "stats":
+                    self._stats_strip(slide)
+                self._FRAGMENTS[name] = [copy.deepcopy(sp._element) for sp in slide.shapes]
+            return self._FRAGMENTS[name]
+
+    def _clone(self, slide, name):
+        """Appends a cached fragment to `slide`, renumbering shape ids so they stay unique."""
+        shapes = slide.shapes
+        for el in self._fragment(name):
+            el = copy.deepcopy(el)
+            c_nv_pr, new_id = el.xpath('./*[1]/p:cNvPr')[0], shapes._next_shape_id
+            c_nv_pr.set('id', str(new_id))
+            c_nv_pr.set('name', re.sub(r'\d+$', str(new_id - 1), c_nv_pr.get('name')))
+            shapes._spTree.insert_element_before(el, 'p:extLst')
+        return shapes
+
+    def _chrome(self, slide, title, page_num):
+        """Header strip + accent + footer, then the per-slide title and page number."""
+        if not self.compiled:
+            self._header(slide, title)
+            self._footer(slide, page_num)
+            return
+        shapes = self._clone(slide, "chrome")
+        shapes[0].text_frame.paragraphs[0].text = title.upper() # Header strip keeps its cached formatting
+        if page_num > 0: self._page_number(slide, page_num)
+
     def _img(self, slide, path, l, t, w, h):
+        from pptx.util import Pt
+        from pptx.dml.color import RGBColor
+        from pptx.enum.shapes import MSO_SHAPE
         if path and os.path.exists(path):
             pic = slide.shapes.add_picture(path, l, t, w, h)
             pic.line.color.rgb = self.BORDER
@@ -86,6 +163,12 @@ class PPTGenerator:
         }.get(section, {})
 
     def generate_ppt(self, data, images, filename):
+        from pptx import Presentation
+        from pptx.util import Inches, Pt
+        from pptx.enum.text import PP_ALIGN
+        from pptx.chart.data import CategoryChartData
+        from pptx.enum.chart import XL_CHART_TYPE
+        from pptx.enum.shapes import MSO_SHAPE
         prs = Presentation()
         while len(images) < 3: images.append(None)
         
@@ -96,8 +179,7 @@ class PPTGenerator:
         # SLIDE 1: EXECUTIVE SUMMARY (Dense Grid Layout)
         # ==============================================================================
         s1 = prs.slides.add_slide(prs.slide_layouts[6])
-        self._header(s1, f"{data.get('code_name', 'Project')} | Executive Summary")
-        self._footer(s1, 1)
+        self._chrome(s1, f"{data.get('code_name', 'Project')} | Executive Summary", 1)
         
         # 1. Headlines (Top Full Width)
         box = s1.shapes.add_textbox(Inches(0.5), Inches(1.1), Inches(9), Inches(0.8))
@@ -119,7 +201,7 @@ class PPTGenerator:
                 p.space_after = Pt(12)
 
         # Right: Image
-        self._img(s1, images[0], Inches(6.2), Inches(2.2), Inches(3.3), Inches(2.2))
+        self._img(s1, images[0], Inches(6.2), Inches(2.2), Inches(self.IMAGE_SLOTS[0][0]), Inches(self.IMAGE_SLOTS[0][1]))
 
         # 3. Compliance Box (Right, below image)
         certs = [b for b in bullets if any(kw in b.lower() for kw in cert_kws)]
@@ -141,31 +223,14 @@ class PPTGenerator:
                 self._fmt(p_c, f"✓ {clean_c[:35]}", 9, color=self.SUCCESS)
 
         # 4. Key Stats Strip (Bottom)
-        strip = s1.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0.5), Inches(5.9), Inches(9), Inches(1.0))
-        strip.fill.solid()
-        strip.fill.fore_color.rgb = self.NAVY
-        strip.line.fill.background()
-        
-        # Fake stats for visual density (if real ones missing)
-        stats = [("Global Reach", "45+ Countries"), ("Industry Rank", "Top 10"), ("Workforce", "500+")]
-        x_stat = Inches(0.8)
-        for label, val in stats:
-            tf = s1.shapes.add_textbox(x_stat, Inches(6.0), Inches(2.5), Inches(0.8)).text_frame
-            p_lbl = tf.paragraphs[0]
-            p_lbl.alignment = PP_ALIGN.CENTER
-            self._fmt(p_lbl, label.upper(), 9, color=RGBColor(200,200,200))
-            
-            p_val = tf.add_paragraph()
-            p_val.alignment = PP_ALIGN.CENTER
-            self._fmt(p_val, val, 16, bold=True, color=self.WHITE)
-            x_stat += Inches(3.0)
+        if self.compiled: self._clone(s1, "stats")
+        else: self._stats_strip(s1)
 
         # ==============================================================================
         # SLIDE 2: FINANCIAL PROFILE (KPI Cards + Chart)
         # ==============================================================================
         s2 = prs.slides.add_slide(prs.slide_layouts[6])
-        self._header(s2, "Financial & Operational Profile")
-        self._footer(s2, 2)
+        self._chrome(s2, "Financial & Operational Profile", 2)
         
         metrics = data['slide_2'].get('metrics', {})
         chart_vals = data['slide_2'].get('chart_data', {}).get('revenue_values', [])
@@ -223,28 +288,29 @@ class PPTGenerator:
             # CAGR Arrow (Calculation)
             try:
                 valid_vals = [v for v in chart_vals if v]
-                if len(valid_vals) >= 2:
+                # Computed upstream (financials.py) over the real year gap when the figures were extracted locally
+                cagr = data['slide_2'].get('chart_data', {}).get('cagr_pct')
+                if cagr is None and len(valid_vals) >= 2:
                     start_v = valid_vals[0]
                     end_v = valid_vals[-1]
                     years_count = len(valid_vals) - 1
                     if start_v > 0 and years_count > 0:
                         cagr = (math.pow(end_v / start_v, 1 / years_count) - 1) * 100
-                        
-                        # Draw Arrow
-                        arrow = s2.shapes.add_shape(MSO_SHAPE.RIGHT_ARROW, Inches(4.5), Inches(2.5), Inches(1.5), Inches(0.4))
-                        arrow.fill.solid()
-                        arrow.fill.fore_color.rgb = self.SUCCESS
-                        arrow.line.fill.background()
-                        arrow.text_frame.paragraphs[0].text = f"CAGR: {cagr:.1f}%"
-                        arrow.text_frame.paragraphs[0].font.size = Pt(10)
+                if cagr is not None:
+                    # Draw Arrow
+                    arrow = s2.shapes.add_shape(MSO_SHAPE.RIGHT_ARROW, Inches(4.5), Inches(2.5), Inches(1.5), Inches(0.4))
+                    arrow.fill.solid()
+                    arrow.fill.fore_color.rgb = self.SUCCESS
+                    arrow.line.fill.background()
+                    arrow.text_frame.paragraphs[0].text = f"CAGR: {cagr:.1f}%"
+                    arrow.text_frame.paragraphs[0].font.size = Pt(10)
             except: pass
 
         # ==============================================================================
         # SLIDE 3: INVESTMENT THESIS (2x2 Matrix Grid)
         # ==============================================================================
         s3 = prs.slides.add_slide(prs.slide_layouts[6])
-        self._header(s3, "Key Investment Highlights")
-        self._footer(s3, 3)
+        self._chrome(s3, "Key Investment Highlights", 3)
         
         hooks = data['slide_3'].get('hooks', [])
         # Coordinates for 2x2 grid
@@ -0,0 +1,108 @@
+import re
+from itertools import product
+from urllib.parse import urlparse
+from keyword_matcher import KeywordMatcher
+
+_SEPARATORS = (" ", "", "-", "_", ".")
+_LEGAL = re.compile(r"\b(ltd|limited|pvt|private|inc|llp|plc|corp|corporation)\.?$", re.IGNORECASE)
+
+def name_variants(name):
+    """'Ind Swift' -> ind swift, indswift, ind-swift, ind_swift, ind.swift (matching is case-insensitive)."""
+    tokens = _LEGAL.sub("", name).split()
+    if not tokens: return set()
+    if len(tokens) == 1: return {tokens[0].lower()}
+    gaps = len(tokens) - 1
+    # Mixed separators per gap only for short names; long names get one separator throughout
+    combos = product(_SEPARATORS, repeat=gaps) if gaps <= 3 else ((s,) * gaps for s in _SEPARATORS)
+    out = set()
+    for seps in combos:
+        out.add("".join(t + s for t, s in zip(tokens, seps + ("",))).lower())
+    return out
+
+# Second-level labels under a ccTLD that are not registrable on their own (indswift.co.in, acme.com.au)
+_SLD = {"co", "com", "net", "org", "gov", "ac", "edu", "ltd", "plc", "firm", "gen", "ind", "res", "nic"}
+
+def _host(url):
+    host = urlparse(url if "://" in url else "http://" + url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+def registrable_domain(host):
+    """'investors.indswiftlabs.co.in' -> 'indswiftlabs.co.in'; subdomains aren't part of the company's name."""
+    labels = host.split(".")
+    keep = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SLD else 2
+    return ".".join(labels[-keep:])
+
+class Redactor:
+    """Per-company masking automaton, built once and run before the prompt and on the output.
+
+    The company name (spacing/punctuation/case variants), website domains, the
+    domain stem ("indswiftlabs") and any known aliases are compiled into a single
+    KeywordMatcher, so each text is scanned once however many variants exist.
+    The stem comes from the registrable domain, never a subdomain like "investors".
+    """
+    def __init__(self, name, websites=(), aliases=(), replacement="Project X", domain_replacement="project-x.example"):
+        self.name = name
+        self.replacement = replacement
+        self.domain_replacement = domain_replacement
+        terms = {}
+        for alias in (name, *aliases):
+            for v in name_variants(alias): terms[v] = "name"
+        for url in websites:
+            host = _host(url) if url else ""
+            if not host: continue
+            domain = registrable_domain(host)
+            terms[host] = terms[domain] = terms["www." + domain] = "domain"
+            stem = domain.split(".")[0]
+            if len(stem) >= 4: terms.setdefault(stem, "name")
+        self.terms = terms
+        self.matcher = KeywordMatcher(terms)
+
+    def redact(self, text):
+        """(masked_text, hits)."""
+        if not isinstance(text, str) or not text: return text, 0
+        parts, pos, hits = [], 0, 0
+        for start, end, _, kind in self.matcher.finditer(text):
+            parts.append(text[pos:start])
+            parts.append(self.domain_replacement if kind == "domain" else self.replacement)
+            pos, hits = end, hits + 1
+        if not hits: return text, 0
+        parts.append(text[pos:])
+        return "".join(parts), hits
+
+    def _redact_label(self, label):
+        masked, hits = self.redact(label)
+        # File names join words with "_", which counts as part of a word for the matcher
+        if hits or not isinstance(label, str) or "_" not in label: return masked, hits
+        return self.redact(label.replace("_", " "))
+
+    def redact_chunks(self, chunks):
+        """Copies of `chunks` with masked text, source and location (originals untouched for the citation doc)
+        and total hits; the prompt shows file names and URLs next to the text."""
+        out, total = [], 0
+        for c in chunks:
+            masked = {}
+            for key in ('text', 'source', 'location'):
+                if key not in c: continue
+                value, hits = self.redact(c[key]) if key == 'text' else self._redact_label(c[key])
+                if hits:
+                    masked[key] = value
+                    total += hits
+            out.append(dict(c, **masked) if masked else c)
+        return out, total
+
+    def redact_obj(self, data):
+        """Masks every string in a JSON-like structure; returns (data, hits)."""
+        if isinstance(data, dict):
+            out, total = {}, 0
+            for k, v in data.items():
+                out[k], hits = self.redact_obj(v)
+                total += hits
+            return out, total
+        if isinstance(data, list):
+            out, total = [], 0
+            for v in data:
+                v, hits = self.redact_obj(v)
+                out.append(v)
+                total += hits
+            return out, total
+        return self.redact(data)
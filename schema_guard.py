@@ -28,21 +28,22 @@ class SectorGuard:
         sector = data.get("sector", "General")
         if sector not in self.metric_rules: return True, "Unknown Sector (Warn)"
         
+        missing = self.missing_metrics(data)
+        if missing: return False, f"Missing metrics matching: {missing}"
+        
+        return True, "OK"
+
+    def missing_metrics(self, data):
+        sector = data.get("sector", "General")
+        if sector not in self.metric_rules: return []
         metrics = data.get("slide_2", {}).get("metrics", {})
         # Check keys loosely (case insensitive)
-        metric_keys = [k.lower() for k in metrics.keys()]
+        metric_keys = [k.lower().replace(" ", "_") for k in metrics.keys()] # "Order Book" satisfies order_book
         required = self.metric_rules[sector]["required"]
         
         # Check if ANY of the required keywords exist in keys
         # e.g. if required='revenue', matches 'Revenue', 'Total Revenue', 'Revenue CAGR'
-        missing = []
-        for req in required:
-            if not any(req in k for k in metric_keys):
-                missing.append(req)
-        
-        if missing: return False, f"Missing metrics matching: {missing}"
-        
-        return True, "OK"
+        return [req for req in required if not any(req in k for k in metric_keys)]
 
     def check_citation_coverage(self, data):
         citations = data.get("citations", [])
@@ -54,4 +55,22 @@ class SectorGuard:
         if forbidden_name.lower() in json_str: return False, "Name Leak"
         for p in self.leak_patterns:
             if re.search(p, json_str): return False, "Semantic Leak"
-        return True, "OK"
\ No newline at end of file
+        return True, "OK"
+
+    def leaked_strings(self, data, forbidden_name, path=()):
+        """[(path, text)] for every string that trips the name or semantic leak checks."""
+        if isinstance(data, dict):
+            return [hit for k, v in data.items() for hit in self.leaked_strings(v, forbidden_name, path + (k,))]
+        if isinstance(data, list):
+            return [hit for i, v in enumerate(data) for hit in self.leaked_strings(v, forbidden_name, path + (i,))]
+        if isinstance(data, str) and self.field_violation(data, forbidden_name):
+            return [(path, data)]
+        return []
+
+    def field_violation(self, text, forbidden_name):
+        """Per-string version of check_anonymity, for fields checked as they stream in."""
+        low = text.lower()
+        if forbidden_name.lower() in low: return "Name Leak"
+        for p in self.leak_patterns:
+            if re.search(p, low): return "Semantic Leak"
+        return None
@@ -0,0 +1,16 @@
+import re
+
+_WORDS = re.compile(r"[^\W\d_]+")
+_DIGITS = re.compile(r"\d")
+_PUNCT = re.compile(r"[^\w\s]")
+
+def estimate_tokens(text):
+    """Offline token estimate, no tokenizer download or API call.
+
+    Words cost ~1.3 tokens (long words split into pieces); Gemini's tokenizer
+    emits one token per digit and per punctuation mark, which is what makes
+    pipe tables and financial rows expensive.
+    """
+    if not text: return 0
+    words = len(_WORDS.findall(text))
+    return int(words * 1.3 + len(_DIGITS.findall(text)) + len(_PUNCT.findall(text))) + 1
@@ -1,11 +1,26 @@
-import requests, random
+import random, os, re, json, time, threading, tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 class VisualEngine:
-    def __init__(self, key):
+    def __init__(self, key, cache_path=".cache/pexels_queries.json", cache_ttl=7 * 86400,
+                 api_base="https://api.pexels.com/v1", assets=None):
         self.key = key
+        self.assets = assets # Optional asset_store.AssetStore; images then come back sized to their slot
         self.headers = {"Authorization": key}
         self.audit_log = [] # FIXED: Restored
-        
+        self.api_base = api_base.rstrip("/")
+
+        # One pooled session shared by searches and downloads across all companies (built on first use)
+        self._session = None
+
+        # vibe query -> {"ts": fetched_at, "photos": [{"url", "alt"}]}, shared across the batch and persisted.
+        # Only the sector vibes are searched; the model's per-company keywords pick among their results.
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self.query_cache = self._load_cache()
+        self.search_stats = {"searches": 0, "cache_hits": 0}
+
         self.vibes = {
             "Manufacturing": ["factory interior blur", "industrial automation"],
             "Pharma": ["laboratory research blur", "pharmaceutical production abstract"],
@@ -16,47 +31,106 @@ class VisualEngine:
         }
         self.risky = ["logo", "text", "sign", "dashboard", "graph", "chart"]
 
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def _load_cache(self):
+        if not self.cache_path: return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _save_cache(self):
+        if not self.cache_path: return
+        if os.path.dirname(self.cache_path): os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with self._lock: snapshot = json.dumps(self.query_cache)
+        tmp = f"{self.cache_path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: f.write(snapshot)
+        os.replace(tmp, self.cache_path)
+
     def fetch_image(self, kw, sector="General", slide_index=0):
         vibe = random.choice(self.vibes.get(sector, self.vibes["General"]))
-        query = f"{vibe} {kw} no text"
-        
-        url = self._search(query)
-        decision = "Smart Query Success"
-        
-        if not url:
-            url = self._search(vibe)
-            decision = "Fallback to Vibe"
-            
-        if url:
-            self.audit_log.append({
-                "slide": slide_index,
-                "query": query,
-                "url": url,
-                "decision": decision
-            })
-            return url
-        return None
+        photos = self._search(vibe)
+        if not photos: return None
+
+        # Keyword refinement on the cached vibe results: best alt-text overlap, else a photo per slide
+        words = set(re.findall(r"[a-z]{3,}", str(kw).lower())) - {"and", "the", "with", "text"}
+        scores = [len(words & set(re.findall(r"[a-z]{3,}", p["alt"].lower()))) for p in photos]
+        if max(scores):
+            top = [p for p, sc in zip(photos, scores) if sc == max(scores)]
+            url, decision = top[slide_index % len(top)]["url"], "Keyword Match in Vibe Results"
+        else:
+            url, decision = photos[slide_index % len(photos)]["url"], "Vibe Only"
+        self.audit_log.append({
+            "slide": slide_index,
+            "query": f"{vibe} [{kw}]",
+            "url": url,
+            "decision": decision
+        })
+        return url
+
+    def fetch_images(self, keywords, sector, paths=None, slots=None):
+        """Searches and downloads one image per slot concurrently; returns the path or None per slot.
+
+        With an asset store, pass `slots` [(width_in, height_in)]: images are served from the store,
+        resized to each slot. Without one, images download to `paths`, or to temp files (one per slot)
+        the caller removes once the deck is rendered.
+        """
+        n = len(slots) if slots else len(paths)
+        if not self.assets and paths is None:
+            tmp = tempfile.mkdtemp(prefix="visuals_")
+            paths = [os.path.join(tmp, f"slot_{i}.jpg") for i in range(n)]
+        def one(i):
+            u = self.fetch_image(keywords[i], sector, slide_index=i+1)
+            if not u: return None
+            if self.assets and slots: return self.assets.get(u, slots[i], self._download_bytes)
+            return paths[i] if self.download_image(u, paths[i]) else None
+        with ThreadPoolExecutor(max_workers=max(1, n)) as pool:
+            return list(pool.map(one, range(n)))
+
+    def _download_bytes(self, url):
+        try:
+            r = self.session.get(url, timeout=10)
+            return r.content if r.status_code == 200 else None
+        except: return None
 
     def _search(self, query):
+        """Safe photos [{"url", "alt"}] for `query`, from the shared cache while within its TTL."""
+        with self._lock:
+            hit = self.query_cache.get(query)
+            if hit and "photos" in hit and time.time() - hit["ts"] < self.cache_ttl:
+                self.search_stats["cache_hits"] += 1
+                return hit["photos"]
+            self.search_stats["searches"] += 1
         try:
-            r = requests.get("https://api.pexels.com/v1/search", 
-                             headers=self.headers, 
-                             params={"query": query, "per_page": 10, "orientation": "landscape"}, 
+            r = self.session.get(f"{self.api_base}/search",
+                             headers=self.headers,
+                             params={"query": f"{query} no text", "per_page": 40, "orientation": "landscape"},
                              timeout=5)
             if r.status_code == 200:
-                photos = r.json().get('photos', [])
-                for p in photos:
-                    if not any(x in p.get('alt', '').lower() for x in self.risky):
-                        return p['src']['large2x']
+                photos = [{"url": p['src']['large2x'], "alt": p.get('alt') or ""} for p in r.json().get('photos', [])
+                          if not any(x in (p.get('alt') or '').lower() for x in self.risky)]
+                with self._lock: self.query_cache[query] = {"ts": time.time(), "photos": photos}
+                self._save_cache()
+                return photos
         except: pass
-        return None
+        return []
 
     def download_image(self, url, path):
-        try:
-            with open(path, 'wb') as f:
-                f.write(requests.get(url, timeout=10).content)
-            return True
-        except: return False
+        data = self._download_bytes(url)
+        if not data: return False
+        with open(path, 'wb') as f:
+            f.write(data)
+        return True
 
     def get_audit_log(self): # FIXED: Restored
-        return self.audit_log
\ No newline at end of file
+        return self.audit_log